@@ -1,12 +1,17 @@
 """
 auth/__init__.py
 """
-from .service import register, login, verify_email, AuthResult
+from .service import register, login, verify_email, AuthResult, register_async, login_async
 from .jwt import create_access_token, decode_token
-from .password import hash_password, verify_password
+from .password import (
+    hash_password, verify_password, needs_rehash,
+    hash_password_async, verify_password_async,
+)
 
 __all__ = [
     "register", "login", "verify_email", "AuthResult",
+    "register_async", "login_async",
     "create_access_token", "decode_token",
-    "hash_password", "verify_password",
+    "hash_password", "verify_password", "needs_rehash",
+    "hash_password_async", "verify_password_async",
 ]
@@ -6,13 +6,14 @@ auth/email.py
 - local 环境：不发真实邮件，把 token 打印到控制台（开发调试专用）
 - cloud 环境：通过 SMTP 发送真实邮件
 
-配置（config/settings.yaml）:
-  auth:
-    email_verification: true
-    smtp:
-      host: smtp.gmail.com
-      port: 587
-      from_address: noreply@tiptoro.app
+配置（config/settings.toml）:
+  [auth]
+  email_verification = true
+
+  [auth.smtp]
+  host = "smtp.gmail.com"
+  port = 587
+  from_address = "noreply@tiptoro.app"
 
 密钥（.env）:
   SMTP_USER=your@email.com
@@ -20,13 +21,118 @@ auth/email.py
 """
 from __future__ import annotations
 
+import atexit
 import os
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import threading
+from functools import lru_cache
 
 from config.loader import app_settings
 
+# SMTP 连接池：按 (host, port, user) 缓存已完成 STARTTLS + AUTH 的空闲连接，
+# 避免每封邮件都重新握手。锁只保护取出/归还，网络 I/O 在锁外进行，
+# 单个 SMTP 服务卡住不会阻塞其他发送线程。连接在进程退出时统一 quit()。
+_smtp_pool: dict[tuple, list["smtplib.SMTP"]] = {}
+_pool_lock = threading.Lock()
+_SMTP_TIMEOUT = 10          # 秒；连接、握手与每次读写均受此约束
+_POOL_MAX_IDLE = 4          # 每个 key 最多保留的空闲连接数
+
+
+# 邮件模板：模块级常量，发送时只做一次 format_map 替换 {url}
+_SUBJECT = "【TipToro】请验证您的邮箱"
+
+_TEXT_TMPL = """\
+欢迎加入 TipToro！
+
+请打开以下链接验证您的邮箱地址：
+{url}
+
+链接 24 小时内有效。若非本人操作，请忽略此邮件。
+"""
+
+_HTML_TMPL = """
+    <div style="font-family: sans-serif; max-width: 480px; margin: auto;">
+      <h2>欢迎加入 TipToro！</h2>
+      <p>请点击下方按钮验证您的邮箱地址：</p>
+      <a href="{url}"
+         style="display:inline-block;padding:12px 24px;background:#4f46e5;color:#fff;
+                border-radius:8px;text-decoration:none;font-weight:bold;">
+        验证邮箱
+      </a>
+      <p style="color:#888;font-size:12px;">链接 24 小时内有效。若非本人操作，请忽略此邮件。</p>
+    </div>
+    """
+
+
+@lru_cache(maxsize=1)
+def _smtp_settings() -> tuple[str, int, str, str, str]:
+    """读取一次 SMTP 配置：(host, port, from_addr, user, password)"""
+    smtp_cfg = app_settings.get_section("auth").get("smtp") or {}
+    smtp_user = os.environ.get("SMTP_USER", "")
+    return (
+        smtp_cfg.get("host", "smtp.gmail.com"),
+        smtp_cfg.get("port", 587),
+        smtp_cfg.get("from_address", smtp_user),
+        smtp_user,
+        os.environ.get("SMTP_PASSWORD", ""),
+    )
+
+
+def _checkout_smtp(host: str, port: int, user: str, password: str) -> "smtplib.SMTP":
+    """
+    从池中取出一个空闲连接（NOOP 探活），没有可用连接时新建。
+    取出后连接归调用方独占，用完经 _checkin_smtp 归还。
+    """
+    import smtplib
+
+    with _pool_lock:
+        idle = _smtp_pool.get((host, port, user))
+        server = idle.pop() if idle else None
+    if server is not None:
+        try:
+            server.noop()
+            return server
+        except (smtplib.SMTPServerDisconnected, OSError):
+            _close_quietly(server)
+    return _connect_smtp(host, port, user, password)
+
+
+def _connect_smtp(host: str, port: int, user: str, password: str) -> "smtplib.SMTP":
+    import smtplib
+
+    server = smtplib.SMTP(host, port, timeout=_SMTP_TIMEOUT)
+    try:
+        server.starttls()
+        server.login(user, password)
+    except BaseException:
+        _close_quietly(server)
+        raise
+    return server
+
+
+def _checkin_smtp(key: tuple, server: "smtplib.SMTP") -> None:
+    with _pool_lock:
+        idle = _smtp_pool.setdefault(key, [])
+        if len(idle) < _POOL_MAX_IDLE:
+            idle.append(server)
+            return
+    _close_quietly(server)
+
+
+def _close_quietly(server: "smtplib.SMTP") -> None:
+    try:
+        server.quit()
+    except Exception:
+        server.close()
+
+
+@atexit.register
+def _close_smtp_pool() -> None:
+    with _pool_lock:
+        servers = [srv for idle in _smtp_pool.values() for srv in idle]
+        _smtp_pool.clear()
+    for server in servers:
+        _close_quietly(server)
+
 
 def send_verification_email(to_email: str, token: str, base_url: str = "http://localhost:8000") -> None:
     """
@@ -45,34 +151,32 @@ def send_verification_email(to_email: str, token: str, base_url: str = "http://l
         print("=" * 60 + "\n")
         return
 
-    # cloud 环境：真实发送 SMTP
-    smtp_cfg = app_settings._raw.get("smtp", {}) if hasattr(app_settings, "_raw") else {}
-    host = smtp_cfg.get("host", "smtp.gmail.com")
-    port = smtp_cfg.get("port", 587)
-    from_addr = smtp_cfg.get("from_address", os.environ.get("SMTP_USER", ""))
-    smtp_user = os.environ.get("SMTP_USER", "")
-    smtp_pass = os.environ.get("SMTP_PASSWORD", "")
+    # cloud 环境：真实发送 SMTP（local 模式不需要这些模块，延迟导入）
+    import smtplib
+    from email.message import EmailMessage
+
+    host, port, from_addr, smtp_user, smtp_pass = _smtp_settings()
 
-    msg = MIMEMultipart("alternative")
-    msg["Subject"] = "【TipToro】请验证您的邮箱"
+    msg = EmailMessage()
+    msg["Subject"] = _SUBJECT
     msg["From"] = from_addr
     msg["To"] = to_email
+    msg.set_content(_TEXT_TMPL.format_map({"url": verify_url}))
+    msg.add_alternative(_HTML_TMPL.format_map({"url": verify_url}), subtype="html")
+    body = msg.as_string()
 
-    html = f"""
-    <div style="font-family: sans-serif; max-width: 480px; margin: auto;">
-      <h2>欢迎加入 TipToro！</h2>
-      <p>请点击下方按钮验证您的邮箱地址：</p>
-      <a href="{verify_url}"
-         style="display:inline-block;padding:12px 24px;background:#4f46e5;color:#fff;
-                border-radius:8px;text-decoration:none;font-weight:bold;">
-        验证邮箱
-      </a>
-      <p style="color:#888;font-size:12px;">链接 24 小时内有效。若非本人操作，请忽略此邮件。</p>
-    </div>
-    """
-    msg.attach(MIMEText(html, "html"))
-
-    with smtplib.SMTP(host, port) as server:
-        server.starttls()
-        server.login(smtp_user, smtp_pass)
-        server.sendmail(from_addr, to_email, msg.as_string())
+    key = (host, port, smtp_user)
+    server = _checkout_smtp(host, port, smtp_user, smtp_pass)
+    try:
+        try:
+            server.sendmail(from_addr, to_email, body)
+        except smtplib.SMTPServerDisconnected:
+            # NOOP 探活与发送之间连接被服务端关闭：重连后重试一次
+            _close_quietly(server)
+            server = _connect_smtp(host, port, smtp_user, smtp_pass)
+            server.sendmail(from_addr, to_email, body)
+    except BaseException:
+        # 出错后连接状态不确定，不再放回池中
+        _close_quietly(server)
+        raise
+    _checkin_smtp(key, server)
@@ -3,40 +3,65 @@ auth/jwt.py
 
 JWT 签发与校验。
 密钥来自环境变量 JWT_SECRET（必须在 .env 中配置）。
-依赖：pip install PyJWT
+依赖：pip install PyJWT cachetools
+
+已校验通过的 token 会在进程内缓存（TTL ≤ 60s 且不超过 token 自身的 exp），
+每个请求都调用 decode_token 的鉴权路径在首次校验后几乎零开销。
 """
 from __future__ import annotations
 
+import hashlib
 import os
-from datetime import datetime, timedelta, timezone
+import threading
+import time
 from typing import Optional
 
-import jwt
+from cachetools import TTLCache
 
-_SECRET: Optional[str] = None
+_SECRET: Optional[bytes] = None
 ALGORITHM = "HS256"
+_ALGORITHMS = [ALGORITHM]
 ACCESS_TOKEN_EXPIRE_HOURS = 24 * 7   # 7 天
 REFRESH_MARGIN_HOURS = 24             # 剩余 24h 内自动续签
 
+DECODE_CACHE_TTL_SECONDS = 60
+# key = blake2b(token)（不在内存中保存原始 token），value = (payload, exp 时间戳)
+_decoded: TTLCache = TTLCache(maxsize=10000, ttl=DECODE_CACHE_TTL_SECONDS)
+_decoded_lock = threading.Lock()
+
+# 只校验实际签发的声明（签名 / exp / iat），跳过未使用的 aud / iss / nbf 校验
+_DECODE_OPTS = {
+    "verify_signature": True,
+    "verify_exp": True,
+    "verify_aud": False,
+    "verify_iss": False,
+    "verify_nbf": False,
+    "require": ["exp"],
+}
 
-def _get_secret() -> str:
+
+def _get_secret() -> bytes:
+    """读取并缓存 JWT_SECRET（bytes，避免每次签发/校验重复编码）"""
     global _SECRET
     if not _SECRET:
-        _SECRET = os.environ.get("JWT_SECRET", "")
-        if not _SECRET:
+        secret = os.environ.get("JWT_SECRET", "")
+        if not secret:
             raise RuntimeError(
                 "JWT_SECRET 未设置！请在 .env 中配置：JWT_SECRET=your-secure-random-key"
             )
+        _SECRET = secret.encode()
     return _SECRET
 
 
 def create_token(payload: dict, expires_hours: int = ACCESS_TOKEN_EXPIRE_HOURS) -> str:
     """签发 JWT，payload 中会自动注入 exp / iat"""
-    now = datetime.now(timezone.utc)
+    import jwt  # 延迟导入：仅在真正签发/校验时加载 PyJWT
+
+    now = int(time.time())
     data = {
         **payload,
         "iat": now,
-        "exp": now + timedelta(hours=expires_hours),
+        "exp": now + expires_hours * 3600,
     }
     return jwt.encode(data, _get_secret(), algorithm=ALGORITHM)
 
@@ -46,8 +71,24 @@ def decode_token(token: str) -> dict:
     解码并校验 JWT。
     - 过期抛出 jwt.ExpiredSignatureError
     - 无效签名抛出 jwt.InvalidTokenError
+    校验成功的结果会被缓存；校验失败不缓存，每次都重新走完整校验。
     """
-    return jwt.decode(token, _get_secret(), algorithms=[ALGORITHM])
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = int(time.time())
+    with _decoded_lock:
+        hit = _decoded.get(key)
+    if hit is not None and hit[1] > now:
+        return dict(hit[0])
+
+    import jwt
+
+    payload = jwt.decode(token, _get_secret(), algorithms=_ALGORITHMS, options=_DECODE_OPTS)
+
+    expiry = payload.get("exp")
+    if isinstance(expiry, (int, float)) and expiry > now:
+        with _decoded_lock:
+            _decoded[key] = (payload, int(expiry))
+    return dict(payload)
 
 
 def create_access_token(user_id: int, email: str) -> str:
@@ -3,15 +3,82 @@ auth/password.py
 
 密码哈希工具（bcrypt）。
 依赖：pip install bcrypt
+bcrypt 在首次哈希/校验时才导入，避免拖慢不涉及密码的启动路径。
+
+工作因子（rounds）通过环境变量 BCRYPT_ROUNDS 配置（可写在 .env），默认 11（约 80ms/次）。
+调高 rounds 后，旧哈希会在用户下次登录成功时通过 needs_rehash() 自动升级。
 """
-import bcrypt
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+
+_bcrypt = None
+_DUMMY_HASH = None
+
+# bcrypt 专用线程池：与数据库等 I/O 线程隔离，避免互相饿死；bcrypt 计算期间释放 GIL
+_bcrypt_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="bcrypt")
+
+
+def _b():
+    """懒加载 bcrypt 模块"""
+    global _bcrypt
+    if _bcrypt is None:
+        import bcrypt as _b2
+        _bcrypt = _b2
+    return _bcrypt
+
+
+@cache
+def _rounds() -> int:
+    """首次使用时读取 BCRYPT_ROUNDS：.env 由配置加载时才写入环境变量，导入期读取会错过"""
+    from config.loader import app_settings
+    app_settings.active_env   # 访问任一配置项即完成 .env 加载
+    return int(os.environ.get("BCRYPT_ROUNDS", "11"))
 
 
 def hash_password(plain: str) -> str:
     """将明文密码哈希后返回字符串（可直接存数据库）"""
-    return bcrypt.hashpw(plain.encode(), bcrypt.gensalt()).decode()
+    bcrypt = _b()
+    return bcrypt.hashpw(plain.encode(), bcrypt.gensalt(rounds=_rounds())).decode()
 
 
 def verify_password(plain: str, hashed: str) -> bool:
     """校验明文密码与哈希值是否匹配"""
-    return bcrypt.checkpw(plain.encode(), hashed.encode())
+    return _b().checkpw(plain.encode(), hashed.encode())
+
+
+def needs_rehash(hashed: str) -> bool:
+    """哈希的 rounds 与当前配置不一致时返回 True（登录成功后据此透明升级）"""
+    try:
+        return int(hashed.split("$")[2]) != _rounds()
+    except (IndexError, ValueError):
+        return True
+
+
+def dummy_hash() -> str:
+    """
+    与真实哈希同 rounds 的占位哈希（首次调用时生成）。
+    登录时用户不存在也对它做一次校验，使两条失败路径耗时一致，避免时序侧信道。
+    """
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password("x")
+    return _DUMMY_HASH
+
+
+# ── 异步包装（供 async Web 框架使用，bcrypt 计算不阻塞事件循环）──
+
+async def hash_password_async(plain: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, hash_password, plain)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, verify_password, plain, hashed)
+
+
+async def dummy_hash_async() -> str:
+    """dummy_hash 的异步版本：首次生成占位哈希同样在 bcrypt 线程池中完成"""
+    if _DUMMY_HASH is not None:
+        return _DUMMY_HASH
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_pool, dummy_hash)
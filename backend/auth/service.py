@@ -6,14 +6,25 @@ auth/service.py
 """
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import secrets
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 from dataclasses import dataclass
 from typing import Optional
 
+from cachetools import TTLCache
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only, raiseload
+
 from infra.database import get_session
 from infra.models import User, EmailVerificationToken, UserProfile, AuthProvider
-from auth.password import hash_password, verify_password
+from auth.password import (
+    hash_password, verify_password, needs_rehash, dummy_hash,
+    hash_password_async, verify_password_async, dummy_hash_async,
+)
 from auth.jwt import create_access_token
 from auth.email import send_verification_email
 
@@ -22,7 +33,7 @@ from auth.email import send_verification_email
 # 返回数据结构
 # ──────────────────────────────────────────────────────────────
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AuthResult:
     success: bool
     user_id: Optional[int] = None
@@ -31,6 +42,11 @@ class AuthResult:
     message: str = ""
 
 
+def _token_digest(token: str) -> bytes:
+    """邮箱验证 token 的入库形式：数据库泄露时无法直接拿来验证邮箱"""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
 # ──────────────────────────────────────────────────────────────
 # 注册
 # ──────────────────────────────────────────────────────────────
@@ -43,48 +59,60 @@ def register(
 ) -> AuthResult:
     """
     注册新用户。
-    - 检查邮箱是否已存在
-    - 创建 User + UserProfile + AuthProvider 记录
+    - 创建 User + UserProfile + AuthProvider 记录（邮箱重复时由唯一索引拒绝）
     - 生成邮箱验证 token，调用邮件服务发送（local 环境打印到控制台）
     """
+    return _register_with_hash(email, hash_password(password), display_name, base_url)
+
+
+async def register_async(
+    email: str,
+    password: str,
+    display_name: Optional[str] = None,
+    base_url: str = "http://localhost:8000",
+) -> AuthResult:
+    """register 的异步版本：bcrypt 走专用线程池，数据库与发信走默认线程池"""
+    password_hash = await hash_password_async(password)
+    return await asyncio.to_thread(_register_with_hash, email, password_hash, display_name, base_url)
+
+
+def _register_with_hash(
+    email: str,
+    password_hash: str,
+    display_name: Optional[str],
+    base_url: str,
+) -> AuthResult:
     email = email.strip().lower()
+    token_str = secrets.token_urlsafe(24)
 
     with get_session() as session:
-        existing = session.query(User).filter_by(email=email).first()
-        if existing:
-            return AuthResult(success=False, message="该邮箱已被注册")
-
         # 1. 创建用户
         user = User(
             email=email,
-            password_hash=hash_password(password),
+            password_hash=password_hash,
             display_name=display_name or email.split("@")[0],
             email_verified=False,
         )
-        session.add(user)
-        session.flush()  # 获取 user.id
 
-        # 2. 创建空白用户资料
-        profile = UserProfile(user_id=user.id)
-        session.add(profile)
-
-        # 3. 记录 email provider
-        provider = AuthProvider(
-            user_id=user.id,
-            provider="email",
-            provider_uid=email,
-        )
-        session.add(provider)
-
-        # 4. 生成邮箱验证 token（24小时有效）
-        token_str = secrets.token_urlsafe(32)
-        verification = EmailVerificationToken(
-            user_id=user.id,
-            token=token_str,
-            expires_at=datetime.now(timezone.utc) + timedelta(hours=24),
-        )
-        session.add(verification)
-        session.flush()
+        # 2. 空白用户资料 + 3. email provider + 4. 邮箱验证 token（24小时有效）
+        #    通过 relationship 关联，一次 flush 写入全部记录
+        session.add_all([
+            user,
+            UserProfile(user=user),
+            AuthProvider(user=user, provider="email", provider_uid=email),
+            EmailVerificationToken(
+                user=user,
+                token_hash=_token_digest(token_str),
+                expires_at=datetime.now(timezone.utc) + timedelta(hours=24),
+            ),
+        ])
+
+        # 邮箱唯一性由数据库唯一索引保证：省去预查询，且并发注册同一邮箱时也不会重复
+        try:
+            session.flush()
+        except IntegrityError:
+            session.rollback()
+            return AuthResult(success=False, message="该邮箱已被注册")
 
         user_id = user.id
         user_email = user.email
@@ -107,22 +135,29 @@ def register(
 def verify_email(token: str) -> AuthResult:
     """校验邮箱验证 token，成功后将 user.email_verified 置为 True"""
     with get_session() as session:
-        record = session.query(EmailVerificationToken).filter_by(token=token, used=False).first()
+        record = (
+            session.query(EmailVerificationToken)
+            .options(load_only(
+                EmailVerificationToken.id,
+                EmailVerificationToken.user_id,
+                EmailVerificationToken.expires_at,
+                EmailVerificationToken.used,
+            ))
+            .filter_by(token_hash=_token_digest(token), used=False)
+            .first()
+        )
         if not record:
             return AuthResult(success=False, message="验证链接无效或已使用")
 
-        now = datetime.now(timezone.utc)
-        # SQLite 存储的 datetime 无时区信息，需兼容处理
-        expires = record.expires_at
-        if expires.tzinfo is None:
-            from datetime import timezone as tz
-            expires = expires.replace(tzinfo=tz.utc)
-
-        if now > expires:
+        # expires_at 由 UTCDateTime 读出，已带 UTC 时区
+        if time.time() > record.expires_at.timestamp():
             return AuthResult(success=False, message="验证链接已过期，请重新发送")
 
         record.used = True
-        user = session.get(User, record.user_id)
+        user = session.get(
+            User, record.user_id,
+            options=[load_only(User.id, User.email, User.email_verified), raiseload("*")],
+        )
         if not user:
             return AuthResult(success=False, message="用户不存在")
         user.email_verified = True
@@ -139,6 +174,11 @@ def verify_email(token: str) -> AuthResult:
 # 登录
 # ──────────────────────────────────────────────────────────────
 
+# 失败登录的短期负缓存（1s），key = blake2b(email + password)，抑制撞库时的重复 bcrypt 计算
+_failed_logins: TTLCache = TTLCache(maxsize=10000, ttl=1)
+_failed_logins_lock = threading.Lock()
+
+
 def login(email: str, password: str) -> AuthResult:
     """
     登录验证。
@@ -146,30 +186,92 @@ def login(email: str, password: str) -> AuthResult:
     - 返回 JWT access token
     """
     email = email.strip().lower()
+    attempt_key = _attempt_key(email, password)
+    if _recently_failed(attempt_key):
+        return AuthResult(success=False, message="邮箱或密码错误")
 
-    with get_session() as session:
-        user = session.query(User).filter_by(email=email, is_active=True).first()
-        if not user or not user.password_hash:
-            return AuthResult(success=False, message="邮箱或密码错误")
+    row = _load_login_user(email)
+    # 用户不存在时也校验一次占位哈希，保证与「密码错误」路径耗时一致
+    pw_ok = verify_password(password, row[2] if row and row[2] else dummy_hash())
+    if row and pw_ok and needs_rehash(row[2]):
+        _update_password_hash(row[0], hash_password(password))
+    return _finish_login(row, pw_ok, attempt_key)
+
+
+async def login_async(email: str, password: str) -> AuthResult:
+    """login 的异步版本：bcrypt 走专用线程池，数据库读写走默认线程池"""
+    email = email.strip().lower()
+    attempt_key = _attempt_key(email, password)
+    if _recently_failed(attempt_key):
+        return AuthResult(success=False, message="邮箱或密码错误")
+
+    row = await asyncio.to_thread(_load_login_user, email)
+    pw_ok = await verify_password_async(password, row[2] if row and row[2] else await dummy_hash_async())
+    if row and pw_ok and needs_rehash(row[2]):
+        new_hash = await hash_password_async(password)
+        await asyncio.to_thread(_update_password_hash, row[0], new_hash)
+    return _finish_login(row, pw_ok, attempt_key)
+
+
+def _attempt_key(email: str, password: str) -> bytes:
+    return hashlib.blake2b(f"{email}\0{password}".encode(), digest_size=16).digest()
 
-        if not verify_password(password, user.password_hash):
-            return AuthResult(success=False, message="邮箱或密码错误")
 
-        if not user.email_verified:
-            return AuthResult(
-                success=False,
-                message="邮箱尚未验证，请先完成邮箱验证后再登录",
+def _recently_failed(attempt_key: bytes) -> bool:
+    """同一组 (邮箱, 密码) 短时间内重复失败时直接拒绝，不再消耗 bcrypt CPU"""
+    with _failed_logins_lock:
+        return attempt_key in _failed_logins
+
+
+def _load_login_user(email: str) -> Optional[tuple[int, str, Optional[str], bool]]:
+    """返回 (id, email, password_hash, email_verified)；bcrypt 校验在会话之外进行"""
+    with get_session() as session:
+        user = (
+            session.query(User)
+            .options(
+                load_only(User.id, User.email, User.password_hash, User.email_verified),
+                raiseload("*"),   # 登录只读列，跳过 profile/auth_providers 的默认急加载
             )
+            .filter_by(email=email, is_active=True)
+            .first()
+        )
+        if not user:
+            return None
+        return user.id, user.email, user.password_hash, user.email_verified
+
 
-        token = create_access_token(user_id=user.id, email=user.email)
+def _update_password_hash(user_id: int, password_hash: str) -> None:
+    """rounds 配置调整后，借登录成功的机会透明升级旧哈希"""
+    with get_session() as session:
+        session.query(User).filter_by(id=user_id).update({User.password_hash: password_hash})
+
+
+def _finish_login(
+    row: Optional[tuple[int, str, Optional[str], bool]],
+    pw_ok: bool,
+    attempt_key: bytes,
+) -> AuthResult:
+    if not row or not row[2] or not pw_ok:
+        with _failed_logins_lock:
+            _failed_logins[attempt_key] = True
+        return AuthResult(success=False, message="邮箱或密码错误")
+
+    user_id, user_email, _, email_verified = row
+    if not email_verified:
         return AuthResult(
-            success=True,
-            user_id=user.id,
-            email=user.email,
-            access_token=token,
-            message="登录成功",
+            success=False,
+            message="邮箱尚未验证，请先完成邮箱验证后再登录",
         )
 
+    token = create_access_token(user_id=user_id, email=user_email)
+    return AuthResult(
+        success=True,
+        user_id=user_id,
+        email=user_email,
+        access_token=token,
+        message="登录成功",
+    )
+
 
 # Phase 2 预留接口（当前为 stub）
 def login_with_phone(phone: str, otp_code: str) -> AuthResult:
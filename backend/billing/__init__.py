@@ -1,12 +1,27 @@
 """
 billing/__init__.py
+
+plans / keys 只依赖标准库，直接导入；
+subscription 依赖 infra.database（SQLAlchemy），按需延迟导入，
+这样 `python3 -m billing.keygen` 等离线工具不会拉起数据库层。
 """
 from .plans import PLANS, get_plan, Plan
-from .keys import generate_key, verify_key, KeyValidationError
-from .subscription import activate_key, get_status, check_can_add_mistake, SubscriptionStatus
+from .keys import generate_key, generate_keys, verify_key, KeyValidationError
+
+_SUBSCRIPTION_EXPORTS = (
+    "activate_key", "get_status", "check_can_add_mistake", "SubscriptionStatus",
+)
+
+
+def __getattr__(name: str):
+    if name in _SUBSCRIPTION_EXPORTS:
+        from . import subscription
+        return getattr(subscription, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     "PLANS", "get_plan", "Plan",
-    "generate_key", "verify_key", "KeyValidationError",
+    "generate_key", "generate_keys", "verify_key", "KeyValidationError",
     "activate_key", "get_status", "check_can_add_mistake", "SubscriptionStatus",
 ]
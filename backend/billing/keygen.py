@@ -4,7 +4,7 @@ billing/keygen.py
 激活码生成命令行工具。
 
 用法：
-  cd /path/to/tiptoro
+  cd /path/to/tiptoro/backend
   BILLING_SECRET=your-secret python3 -m billing.keygen --plan trial
   BILLING_SECRET=your-secret python3 -m billing.keygen --plan monthly --note "VIP-2026"
   BILLING_SECRET=your-secret python3 -m billing.keygen --plan annual --count 5
@@ -20,16 +20,31 @@ billing/keygen.py
 import argparse
 import sys
 import os
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
-# 确保从 tiptoro/backend/ 目录或 tiptoro/ 根目录均可运行
-_here = Path(__file__).parent.parent  # backend/
-if str(_here) not in sys.path:
-    sys.path.insert(0, str(_here))
+# billing/__init__.py 对 subscription 做了延迟导入，这里只会加载 plans / keys（纯标准库）
+from billing.plans import PLANS
+from billing.keys import generate_keys
 
-# 直接导入，不走 billing/__init__.py（避免触发 infra DB 初始化）
-from billing.plans import PLANS, get_plan   # noqa: E402
-from billing.keys import generate_key       # noqa: E402
+# 超过该数量时按 CPU 核数分块，多进程并行签名（HMAC 为纯 CPU 计算，线程受 GIL 限制）
+_PARALLEL_THRESHOLD = 10000
+
+
+def _write_keys(plan_id: str, count: int, note: str) -> None:
+    if count < _PARALLEL_THRESHOLD:
+        keys = generate_keys(plan_id, count, note)
+        sys.stdout.write("\n".join(keys) + "\n")
+        return
+
+    workers = os.cpu_count() or 1
+    size = -(-count // workers)
+    starts = list(range(1, count + 1, size))
+    sizes = [min(size, count - s + 1) for s in starts]
+    # 子进程从继承的环境变量读取 BILLING_SECRET；按提交顺序逐块输出，不在内存中拼接全部结果
+    sys.stdout.flush()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for keys in pool.map(generate_keys, [plan_id] * len(starts), sizes, [note] * len(starts), starts):
+            sys.stdout.write("\n".join(keys) + "\n")
 
 
 def main():
@@ -79,10 +94,7 @@ def main():
     print(f"🔢 生成数量: {args.count}\n")
     print("─" * 60)
 
-    for i in range(args.count):
-        note = f"{args.note}-{i+1}" if args.count > 1 and args.note else args.note
-        key = generate_key(args.plan, note=note)
-        print(key)
+    _write_keys(args.plan, args.count, args.note)
 
     print("─" * 60)
     print(f"\n✅ 已生成 {args.count} 个激活码")
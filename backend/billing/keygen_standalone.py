@@ -41,18 +41,18 @@ def _get_secret() -> bytes:
     return s.encode()
 
 
-def _sign(payload: str) -> str:
-    return hmac.new(_get_secret(), payload.encode(), hashlib.sha256).hexdigest()
+def _sign(payload: bytes) -> bytes:
+    return hmac.new(_get_secret(), payload, hashlib.sha256).digest()
 
 
 def generate_key(plan_id: str, note: str = "") -> str:
+    # 格式须与 billing/keys.py 保持一致：{payload}|<32 字节原始签名>
     nonce = secrets.token_hex(4)
     created = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
     note = note.replace("|", "-")
-    payload = f"{plan_id}|{created}|{nonce}|{note}"
-    sig = _sign(payload)
-    raw = f"{payload}|{sig}"
-    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    payload = f"{plan_id}|{created}|{nonce}|{note}".encode()
+    raw = payload + b"|" + _sign(payload)
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
 
 
 def main():
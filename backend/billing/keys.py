@@ -3,11 +3,14 @@ billing/keys.py
 
 激活码生成与验证（HMAC-SHA256 签名，无需数据库即可验证）。
 
-Key 格式（Base64URL 编码）：
-  {plan}|{expires_iso}|{nonce}|{hmac_hex}
+Key 格式（Base64URL 编码，无填充）：
+  {plan}|{created_iso}|{nonce}|{note}|<32 字节原始 HMAC-SHA256 摘要>
 
 例：
-  monthly|2026-03-21T13:42:00|a3f9|<hmac>
+  monthly|2026-03-21T13:42:00|a3f9c2d1|VIP-001|<hmac>
+
+签名固定为末尾 32 字节，解析时从右侧按长度切分，不受 note 内容影响。
+旧版（十六进制签名，{payload}|{hmac_hex}）激活码仍可验证。
 
 密钥来源：环境变量 BILLING_SECRET（配置在 .env 中）。
 
@@ -30,28 +33,45 @@ from .plans import get_plan, Plan
 
 # ── 内部工具 ─────────────────────────────────────────────────
 
+_SECRET: Optional[bytes] = None
+# 预初始化的 HMAC 对象（已完成 ipad/opad 密钥派生），每次签名 .copy() 复用
+_HMAC_PROTO: Optional["hmac.HMAC"] = None
+
 
 def _get_secret() -> bytes:
-    secret = os.environ.get("BILLING_SECRET", "")
-    if not secret:
-        raise RuntimeError(
-            "BILLING_SECRET 未设置！请在 backend/.env 中配置：\n"
-            "  BILLING_SECRET=your-random-32+-character-string"
-        )
-    return secret.encode()
+    global _SECRET
+    if _SECRET is None:
+        secret = os.environ.get("BILLING_SECRET", "")
+        if not secret:
+            raise RuntimeError(
+                "BILLING_SECRET 未设置！请在 backend/.env 中配置：\n"
+                "  BILLING_SECRET=your-random-32+-character-string"
+            )
+        _SECRET = secret.encode()
+    return _SECRET
+
+
+_SIG_LEN = 32                      # SHA-256 原始摘要长度
+# nonce 随机字节数：8 字节（16 位 hex，activation_keys.nonce 为 String(20)），
+# 百万级批量生成时碰撞概率仍可忽略；撞上的 Key 会在激活时被判为“已被使用”
+_NONCE_BYTES = 8
 
 
-def _sign(payload: str) -> str:
-    return hmac.new(_get_secret(), payload.encode(), hashlib.sha256).hexdigest()
+def _sign(payload: bytes) -> bytes:
+    global _HMAC_PROTO
+    if _HMAC_PROTO is None:
+        _HMAC_PROTO = hmac.new(_get_secret(), b"", hashlib.sha256)
+    h = _HMAC_PROTO.copy()
+    h.update(payload)
+    return h.digest()
 
 
-def _b64url_encode(s: str) -> str:
-    return base64.urlsafe_b64encode(s.encode()).decode().rstrip("=")
+def _b64url_encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
 
 
-def _b64url_decode(s: str) -> str:
-    padding = 4 - len(s) % 4
-    return base64.urlsafe_b64decode(s + "=" * padding).decode()
+def _b64url_decode(s: str) -> bytes:
+    return base64.urlsafe_b64decode(s + "=" * (-len(s) % 4))
 
 
 # ── Key 生成 ──────────────────────────────────────────────────
@@ -72,14 +92,38 @@ def generate_key(plan_id: str, note: str = "") -> str:
     now = datetime.now(timezone.utc)
     # Key 本身不嵌入 expires，由激活时的当前时间 + plan.duration_days 计算
     # 但记录生成时间，以便审计
-    nonce = secrets.token_hex(4)                 # 8 chars 随机数，防重放
+    nonce = secrets.token_hex(_NONCE_BYTES)      # 随机数，防重放
     created_iso = now.strftime("%Y-%m-%dT%H:%M:%S")
     note_part = note.replace("|", "-")           # 防止分隔符冲突
 
-    payload = f"{plan_id}|{created_iso}|{nonce}|{note_part}"
-    sig = _sign(payload)
-    raw = f"{payload}|{sig}"
-    return _b64url_encode(raw)
+    payload = f"{plan_id}|{created_iso}|{nonce}|{note_part}".encode()
+    return _b64url_encode(payload + b"|" + _sign(payload))
+
+
+def generate_keys(plan_id: str, count: int, note: str = "", start: int = 1) -> list[str]:
+    """
+    批量生成激活码（keygen CLI 使用）。
+
+    与逐个调用 generate_key 等价，但时间戳只取一次、随机数一次性抽取，
+    批量越大收益越明显。count > 1 且有备注时，备注自动追加序号（如 VIP-1, VIP-2）。
+    start 为起始序号，多进程分块生成时用于保证序号连续不重复。
+
+    Returns:
+        激活码列表，长度为 count
+    """
+    get_plan(plan_id)
+    created_iso = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    note_part = note.replace("|", "-")
+    numbered = (count > 1 or start > 1) and bool(note_part)
+    rng = secrets.token_bytes(_NONCE_BYTES * count)
+
+    keys = []
+    for i in range(count):
+        nonce = rng[i * _NONCE_BYTES:(i + 1) * _NONCE_BYTES].hex()
+        n = f"{note_part}-{start + i}" if numbered else note_part
+        payload = f"{plan_id}|{created_iso}|{nonce}|{n}".encode()
+        keys.append(_b64url_encode(payload + b"|" + _sign(payload)))
+    return keys
 
 
 # ── Key 验证 ──────────────────────────────────────────────────
@@ -104,17 +148,22 @@ def verify_key(key: str) -> dict:
     except Exception:
         raise KeyValidationError("激活码格式错误")
 
-    parts = raw.split("|")
-    if len(parts) != 5:
-        raise KeyValidationError("激活码格式错误（字段数不匹配）")
+    # 签名固定为末尾 32 字节，从右侧按长度切分
+    payload, sep, provided_sig = raw[:-_SIG_LEN - 1], raw[-_SIG_LEN - 1:-_SIG_LEN], raw[-_SIG_LEN:]
+    if sep != b"|" or not hmac.compare_digest(provided_sig, _sign(payload)):
+        # 兼容旧版：{payload}|{hmac_hex}
+        payload, _, hex_sig = raw.rpartition(b"|")
+        if not payload or not hmac.compare_digest(hex_sig, _sign(payload).hex().encode()):
+            raise KeyValidationError("激活码签名无效")
 
-    plan_id, created_iso, nonce, note, provided_sig = parts
+    try:
+        parts = payload.decode().split("|", 3)
+    except UnicodeDecodeError:
+        raise KeyValidationError("激活码格式错误")
+    if len(parts) != 4:
+        raise KeyValidationError("激活码格式错误（字段数不匹配）")
 
-    # 验证签名
-    payload = f"{plan_id}|{created_iso}|{nonce}|{note}"
-    expected_sig = _sign(payload)
-    if not hmac.compare_digest(provided_sig, expected_sig):
-        raise KeyValidationError("激活码签名无效")
+    plan_id, created_iso, nonce, note = parts
 
     # 验证套餐合法性
     plan = get_plan(plan_id)  # 会抛出 ValueError 如果 plan_id 不合法
@@ -20,7 +20,7 @@ class WechatPayProvider(PaymentProvider):
     """微信支付 v3 适配器（待实现）"""
 
     def __init__(self):
-        # TODO: 从 config/settings.yaml 或 .env 加载微信支付配置
+        # TODO: 从 config/settings.toml 或 .env 加载微信支付配置
         # import os
         # self.mch_id = os.environ.get("WECHAT_PAY_MCH_ID", "")
         # self.api_v3_key = os.environ.get("WECHAT_PAY_API_V3_KEY", "")
@@ -10,7 +10,7 @@ from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Plan:
     id: str                        # 套餐标识符：trial / monthly / annual
     name: str                      # 显示名称
@@ -60,6 +60,7 @@ PLANS: dict[str, Plan] = {
 
 
 def get_plan(plan_id: str) -> Plan:
-    if plan_id not in PLANS:
+    plan = PLANS.get(plan_id)
+    if plan is None:
         raise ValueError(f"未知套餐: {plan_id!r}，可选: {list(PLANS)}")
-    return PLANS[plan_id]
+    return plan
@@ -6,19 +6,25 @@ billing/subscription.py
 """
 from __future__ import annotations
 
+import hashlib
+import time
 from dataclasses import dataclass
+from functools import cache
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from infra.database import get_session
+from sqlalchemy import func, select
+
+from infra.database import dialect_insert, get_session
 from infra.models import Subscription, ActivationKey, UserMistakeRecord
-from billing.keys import verify_key, KeyValidationError
+from infra.request_cache import invalidate, memoize
+from billing.keys import verify_key, KeyValidationError, _get_secret
 from billing.plans import get_plan, Plan
 
 
 # ── 响应数据结构 ─────────────────────────────────────────────────
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SubscriptionStatus:
     active: bool
     plan_id: Optional[str]
@@ -54,65 +60,95 @@ def activate_key(user_id: int, key: str) -> SubscriptionStatus:
     plan = key_info["plan"]
     key_nonce = key_info["nonce"]
 
-    with get_session() as session:
-        # 2. 检查 Key 是否已被激活（通过 nonce 去重）
-        existing_key = session.query(ActivationKey).filter_by(nonce=key_nonce).first()
-        if existing_key and existing_key.used_by_user_id is not None:
-            return SubscriptionStatus(
-                active=False, plan_id=None, plan_name=None,
-                expires_at=None, days_remaining=None,
-                mistakes_used=0, mistakes_limit=None,
-                can_add_mistake=False,
-                message="此激活码已被使用",
-            )
+    # 2. 计算订阅有效期
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(days=plan.duration_days)
 
-        # 3. 计算订阅有效期
-        now = datetime.now(timezone.utc)
-        expires_at = now + timedelta(days=plan.duration_days)
+    with get_session() as session:
+        insert = dialect_insert(session)
 
-        # 4. 记录激活码使用
-        if not existing_key:
-            existing_key = ActivationKey(
+        # 3. 记录激活码使用：单条 upsert，仅当未被占用时写入 used_by_user_id，
+        #    并发激活同一 Key 时只有一方能命中（rowcount == 1）
+        res = session.execute(
+            insert(ActivationKey)
+            .values(
                 nonce=key_nonce,
                 plan_id=plan.id,
                 raw_key_hash=_hash_key(key),
                 created_at=now,
                 note=key_info.get("note", ""),
+                used_by_user_id=user_id,
+                activated_at=now,
+            )
+            .on_conflict_do_update(
+                index_elements=[ActivationKey.nonce],
+                set_={"used_by_user_id": user_id, "activated_at": now},
+                where=ActivationKey.used_by_user_id.is_(None),
+            )
+        )
+        if res.rowcount == 0:
+            return SubscriptionStatus(
+                active=False, plan_id=None, plan_name=None,
+                expires_at=None, days_remaining=None,
+                mistakes_used=0, mistakes_limit=None,
+                can_add_mistake=False,
+                message="此激活码已被使用",
             )
-            session.add(existing_key)
-        existing_key.used_by_user_id = user_id
-        existing_key.activated_at = now
 
-        # 5. 创建/覆盖用户订阅（新订阅覆盖旧订阅）
-        sub = session.query(Subscription).filter_by(user_id=user_id).first()
-        if sub:
-            sub.plan_id = plan.id
-            sub.expires_at = expires_at
-            sub.activated_at = now
-            sub.status = "active"
-        else:
-            sub = Subscription(
+        # 4. 创建/覆盖用户订阅（新订阅覆盖旧订阅；错题计数仅在新建时初始化）
+        session.execute(
+            insert(Subscription)
+            .values(
                 user_id=user_id,
                 plan_id=plan.id,
                 expires_at=expires_at,
                 activated_at=now,
                 status="active",
+                mistakes_count=select(func.count(UserMistakeRecord.id))
+                .where(UserMistakeRecord.user_id == user_id)
+                .scalar_subquery(),
+            )
+            .on_conflict_do_update(
+                index_elements=[Subscription.user_id],
+                set_={
+                    "plan_id": plan.id,
+                    "expires_at": expires_at,
+                    "activated_at": now,
+                    "status": "active",
+                },
             )
-            session.add(sub)
+        )
 
+    _invalidate_user(user_id)
     return get_status(user_id)
 
 
-def _hash_key(key: str) -> str:
-    import hashlib
-    return hashlib.sha256(key.encode()).hexdigest()
+def _hash_key(key: str) -> bytes:
+    """
+    激活码审计指纹：以 BILLING_SECRET 为密钥的 16 字节 BLAKE2b（等价于 HMAC）。
+    数据库泄露时无法离线穷举短激活码。
+    """
+    return hashlib.blake2b(
+        key.encode(), digest_size=16, key=_key_hash_secret(), person=b"tiptoro-actkey",
+    ).digest()
+
+
+@cache
+def _key_hash_secret() -> bytes:
+    # BLAKE2b 密钥最长 64 字节，先压缩 BILLING_SECRET
+    return hashlib.blake2b(_get_secret()).digest()
 
 
 # ── 状态查询 ─────────────────────────────────────────────────────
 
 def get_status(user_id: int) -> SubscriptionStatus:
-    """查询用户当前订阅状态和配额使用情况"""
+    """查询用户当前订阅状态和配额使用情况（同一请求内只查一次库）"""
+    return memoize(("subscription_status", user_id), lambda: _load_status(user_id))
+
+
+def _load_status(user_id: int) -> SubscriptionStatus:
     with get_session() as session:
+        # 错题数直接读订阅上的计数器，无需 COUNT(*)
         sub = session.query(Subscription).filter_by(user_id=user_id).first()
 
         # 无订阅
@@ -125,13 +161,12 @@ def get_status(user_id: int) -> SubscriptionStatus:
                 message="暂无有效订阅，请激活激活码",
             )
 
-        now = datetime.now(timezone.utc)
+        # expires_at 由 UTCDateTime 读出，已带 UTC 时区
         expires = sub.expires_at
-        if expires.tzinfo is None:
-            expires = expires.replace(tzinfo=timezone.utc)
+        remaining = expires.timestamp() - time.time()
 
         # 检查是否过期
-        if now > expires:
+        if remaining < 0:
             return SubscriptionStatus(
                 active=False,
                 plan_id=sub.plan_id,
@@ -144,10 +179,8 @@ def get_status(user_id: int) -> SubscriptionStatus:
             )
 
         plan = get_plan(sub.plan_id)
-        days_remaining = (expires - now).days
-
-        # 统计错题数
-        mistakes_used = session.query(UserMistakeRecord).filter_by(user_id=user_id).count()
+        days_remaining = int(remaining // 86400)
+        mistakes_used = sub.mistakes_count
 
         can_add = plan.is_unlimited or (mistakes_used < (plan.max_mistakes or 0))
 
@@ -171,9 +204,31 @@ def check_can_add_mistake(user_id: int) -> tuple[bool, str]:
     快速检查用户是否可以新增错题。
     Returns: (can_add: bool, reason: str)
     """
+    # 快速路径：不限量套餐且未过期时无需统计错题数
+    row = memoize(("subscription_row", user_id), lambda: _load_plan_row(user_id))
+    if row is not None:
+        plan_id, expires = row
+        if get_plan(plan_id).is_unlimited and time.time() <= expires.timestamp():
+            return True, "ok"
+
     status = get_status(user_id)
     if not status.active:
         return False, status.message
     if not status.can_add_mistake:
         return False, f"试用版最多 {status.mistakes_limit} 道错题，请升级套餐"
     return True, "ok"
+
+
+def _load_plan_row(user_id: int):
+    with get_session() as session:
+        return (
+            session.query(Subscription.plan_id, Subscription.expires_at)
+            .filter_by(user_id=user_id)
+            .first()
+        )
+
+
+def _invalidate_user(user_id: int) -> None:
+    """订阅变更后，丢弃当前请求内缓存的查询结果（错题计数变更由 infra.models 的事件处理）"""
+    invalidate(("subscription_status", user_id))
+    invalidate(("subscription_row", user_id))
@@ -2,26 +2,37 @@
 config/loader.py
 
 统一配置加载器 (AppSettings)。
-- 读取 config/settings.yaml（行为配置，提交到 git）
+- 读取 config/settings.toml（行为配置，提交到 git）
 - 自动加载 .env 文件（密钥，不提交 git）
-- 环境变量优先级高于 yaml 中的任何值
+- 环境变量优先级高于 toml 中的任何值
 - 提供全局单例 app_settings
 
 所有模块（llm/、infra/）改为从此处读取配置，
-不再各自维护独立的 yaml 文件和加载器。
+不再各自维护独立的配置文件和加载器。
 """
 from __future__ import annotations
 
+import marshal
 import os
-from dataclasses import dataclass, field
+import re
+from dataclasses import dataclass, field, fields
+from functools import cache
 from pathlib import Path
 from typing import Literal
 
-import yaml
+try:
+    import tomllib                   # Python 3.11+ 标准库
+except ImportError:
+    import tomli as tomllib
 
-SETTINGS_PATH = Path(__file__).parent / "settings.yaml"
+SETTINGS_PATH = Path(__file__).parent / "settings.toml"
 PROJECT_ROOT = Path(__file__).parent.parent
 ENV_FILE = PROJECT_ROOT / ".env"
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "tiptoro"
+
+
+# 注释行、空行、非法 key 均不匹配；值两端空白（含 \r）被裁掉
+_ENV_RE = re.compile(r"(?m)^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*(.*?)[ \t\r]*$")
 
 
 def _load_dotenv() -> None:
@@ -35,16 +46,38 @@ def _load_dotenv() -> None:
         return
     except ImportError:
         pass
-    # 降级：手动解析
-    for line in ENV_FILE.read_text(encoding="utf-8").splitlines():
-        line = line.strip()
-        if not line or line.startswith("#") or "=" not in line:
-            continue
-        key, _, value = line.partition("=")
-        key = key.strip()
-        value = value.strip()
-        if key and key not in os.environ:
-            os.environ[key] = value
+    # 降级：一次正则提取全部 KEY=VALUE，批量写入（已有的环境变量不覆盖）
+    pairs = _ENV_RE.findall(ENV_FILE.read_text(encoding="utf-8"))
+    os.environ.update({k: v for k, v in pairs if k not in os.environ})
+
+
+def _read_settings(settings_path: Path) -> dict:
+    """
+    读取 settings.toml，解析结果以 marshal 缓存到 CACHE_DIR。
+    缓存以源文件 (路径, mtime_ns, size) 为键，文件变更后自动失效；
+    缓存读写失败时静默回退为直接解析。
+    """
+    st = settings_path.stat()
+    key = (str(settings_path.resolve()), st.st_mtime_ns, st.st_size)
+    cache_file = CACHE_DIR / "settings.marshal"
+    try:
+        cached_key, raw = marshal.loads(cache_file.read_bytes())
+        if tuple(cached_key) == key:
+            return raw
+    except Exception:
+        pass
+
+    with open(settings_path, "rb") as f:
+        raw = tomllib.load(f)
+
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(marshal.dumps((key, raw)))
+        os.replace(tmp, cache_file)
+    except (OSError, ValueError):   # ValueError: TOML 日期时间等 marshal 不支持的类型，不缓存
+        pass
+    return raw
 
 
 # ── 数据结构 ──────────────────────────────────────────────────────────────────
@@ -61,17 +94,17 @@ class DatabaseConfig:
     pool_size: int = 5
     max_overflow: int = 10
     echo_sql: bool = False
+    url: str = ""                 # 由 AppSettings._parse_db 在加载时一次性计算
 
-    @property
-    def url(self) -> str:
-        if self.driver == "sqlite":
-            p = (PROJECT_ROOT / self.path).resolve()
-            p.parent.mkdir(parents=True, exist_ok=True)
-            return f"sqlite:///{p}"
-        return (
-            f"postgresql+psycopg2://{self.user}:{self.password}"
-            f"@{self.host}:{self.port}/{self.name}"
-        )
+
+def _database_url(db: DatabaseConfig) -> str:
+    """计算连接 URL；SQLite 路径仅做字面规范化（abspath 无系统调用），目录由 get_engine 创建"""
+    if db.driver == "sqlite":
+        return f"sqlite:///{os.path.abspath(os.path.join(PROJECT_ROOT, db.path))}"
+    return (
+        f"postgresql+psycopg2://{db.user}:{db.password}"
+        f"@{db.host}:{db.port}/{db.name}"
+    )
 
 
 @dataclass
@@ -94,7 +127,7 @@ class ProviderSettings:
     default_model: str
     timeout: int = 60
     max_retries: int = 3
-    # 密钥从环境变量注入，不存 yaml
+    # 密钥从环境变量注入，不存 toml
     api_key: str = ""
     extra: dict = field(default_factory=dict)
 
@@ -124,6 +157,32 @@ class LLMSettings:
     generation_defaults: GenerationDefaults = field(default_factory=GenerationDefaults)
 
 
+@cache
+def _field_names(cls: type) -> frozenset[str]:
+    return frozenset(f.name for f in fields(cls))
+
+
+def _build(cls: type, cfg: dict, **overrides):
+    """按 dataclass 字段过滤配置段后一次性构造；overrides（环境变量等）优先于配置文件"""
+    names = _field_names(cls)
+    kwargs = {k: v for k, v in cfg.items() if k in names}
+    kwargs.update(overrides)
+    return cls(**kwargs)
+
+
+def _env_overrides(mapping: dict[str, str]) -> dict[str, str]:
+    """{字段名: 环境变量名} → 仅包含已设置的环境变量"""
+    return {k: os.environ[env] for k, env in mapping.items() if env in os.environ}
+
+
+# provider 专属的额外环境变量：{provider: {extra 字段名: 环境变量名}}
+_PROVIDER_EXTRA_ENV: dict[str, dict[str, str]] = {
+    "minimax": {"group_id": "MINIMAX_GROUP_ID"},
+}
+
+_PG_ENV = {"host": "DB_HOST", "port": "DB_PORT", "name": "DB_NAME", "user": "DB_USER", "password": "DB_PASSWORD"}
+
+
 # ── 主加载器 ──────────────────────────────────────────────────────────────────
 
 class AppSettings:
@@ -133,22 +192,24 @@ class AppSettings:
         self._db: DatabaseConfig | None = None
         self._storage: StorageConfig | None = None
         self._llm: LLMSettings | None = None
+        self._raw: dict = {}
         self._active_env: str = "local"
         self._loaded = False
 
     def load(self, settings_path: Path = SETTINGS_PATH) -> "AppSettings":
         _load_dotenv()
 
-        with open(settings_path, encoding="utf-8") as f:
-            raw = yaml.safe_load(f)
+        raw = _read_settings(settings_path)
 
         self._active_env = os.environ.get("TIPTORO_ENV", raw.get("active_env", "local"))
         if self._active_env not in ("local", "cloud"):
             raise ValueError(f"TIPTORO_ENV must be 'local' or 'cloud', got '{self._active_env}'")
 
-        self._db = self._parse_db(raw.get("database", {}))
-        self._storage = self._parse_storage(raw.get("storage", {}))
-        self._llm = self._parse_llm(raw.get("llm", {}))
+        # 各配置段在首次 get_* 时才解析（仅用到 DB 的脚本无需构造 LLM/Storage 配置）
+        self._raw = raw
+        self._db = None
+        self._storage = None
+        self._llm = None
         self._loaded = True
         return self
 
@@ -158,22 +219,19 @@ class AppSettings:
         env_cfg = cfg.get(self._active_env, {})
         driver = env_cfg.get("driver", "sqlite")
         if driver == "sqlite":
-            return DatabaseConfig(
-                driver="sqlite",
-                path=env_cfg.get("path", "./data/tiptoro_local.db"),
-                echo_sql=env_cfg.get("echo_sql", True),
+            db = _build(DatabaseConfig, {"echo_sql": True, **env_cfg}, driver="sqlite")
+        else:
+            overrides = _env_overrides(_PG_ENV)
+            if "port" in overrides:
+                overrides["port"] = int(overrides["port"])
+            db = _build(
+                DatabaseConfig,
+                {"pool_size": 10, "max_overflow": 20, **env_cfg},
+                driver="postgresql",
+                **overrides,
             )
-        return DatabaseConfig(
-            driver="postgresql",
-            host=os.environ.get("DB_HOST", env_cfg.get("host", "localhost")),
-            port=int(os.environ.get("DB_PORT", env_cfg.get("port", 5432))),
-            name=os.environ.get("DB_NAME", env_cfg.get("name", "tiptoro")),
-            user=os.environ.get("DB_USER", env_cfg.get("user", "")),
-            password=os.environ.get("DB_PASSWORD", env_cfg.get("password", "")),
-            pool_size=env_cfg.get("pool_size", 10),
-            max_overflow=env_cfg.get("max_overflow", 20),
-            echo_sql=env_cfg.get("echo_sql", False),
-        )
+        db.url = _database_url(db)
+        return db
 
     # ── Storage ───────────────────────────────────────────────────────────────
 
@@ -181,27 +239,16 @@ class AppSettings:
         env_cfg = cfg.get(self._active_env, {})
         driver = env_cfg.get("driver", "local")
         if driver == "local":
-            return StorageConfig(
-                driver="local",
-                root_dir=env_cfg.get("root_dir", "./data/storage"),
-                base_url=env_cfg.get("base_url", ""),
-            )
+            return _build(StorageConfig, env_cfg, driver="local")
         if driver == "aliyun_oss":
-            return StorageConfig(
-                driver="aliyun_oss",
-                bucket=env_cfg.get("bucket", ""),
-                region=env_cfg.get("region", ""),
-                endpoint=env_cfg.get("endpoint", ""),
-                base_url=env_cfg.get("base_url", ""),
+            return _build(
+                StorageConfig, env_cfg,
                 access_key_id=os.environ.get("OSS_ACCESS_KEY_ID", ""),
                 access_key_secret=os.environ.get("OSS_ACCESS_KEY_SECRET", ""),
             )
         if driver == "aws_s3":
-            return StorageConfig(
-                driver="aws_s3",
-                bucket=env_cfg.get("bucket", ""),
-                region=env_cfg.get("region", ""),
-                base_url=env_cfg.get("base_url", ""),
+            return _build(
+                StorageConfig, env_cfg,
                 access_key_id=os.environ.get("AWS_ACCESS_KEY_ID", ""),
                 secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY", ""),
             )
@@ -220,28 +267,22 @@ class AppSettings:
         }
 
         # API key 环境变量名约定: {PROVIDER_NAME}_API_KEY
+        env = os.environ
         providers: dict[str, ProviderSettings] = {}
+        field_names = _field_names(ProviderSettings)
         for name, pcfg in (cfg.get("providers") or {}).items():
-            api_key = os.environ.get(f"{name.upper()}_API_KEY", "")
-            extra = {}
-            if name == "minimax":
-                extra["group_id"] = os.environ.get("MINIMAX_GROUP_ID", "")
-            providers[name] = ProviderSettings(
+            # 非字段键（如 max_concurrency / qpm）进入 extra，环境变量优先
+            extra = {k: v for k, v in pcfg.items() if k not in field_names}
+            extra.update({k: env[var] for k, var in _PROVIDER_EXTRA_ENV.get(name, {}).items() if var in env})
+            providers[name] = _build(
+                ProviderSettings,
+                {"base_url": "", "default_model": "", **pcfg},
                 name=name,
-                base_url=pcfg.get("base_url", ""),
-                default_model=pcfg.get("default_model", ""),
-                timeout=pcfg.get("timeout", 60),
-                max_retries=pcfg.get("max_retries", 3),
-                api_key=api_key,
+                api_key=env.get(name.upper() + "_API_KEY", ""),
                 extra=extra,
             )
 
-        gd = cfg.get("generation_defaults") or {}
-        defaults = GenerationDefaults(
-            temperature=gd.get("temperature", 0.2),
-            max_tokens=gd.get("max_tokens", 2048),
-            top_p=gd.get("top_p", 0.95),
-        )
+        defaults = _build(GenerationDefaults, cfg.get("generation_defaults") or {})
         return LLMSettings(roles=roles, providers=providers, generation_defaults=defaults)
 
     # ── 公共查询 API ──────────────────────────────────────────────────────────
@@ -253,23 +294,33 @@ class AppSettings:
 
     def get_db(self) -> DatabaseConfig:
         self._ensure_loaded()
-        return self._db  # type: ignore
+        if self._db is None:
+            self._db = self._parse_db(self._raw.get("database", {}))
+        return self._db
 
     def get_storage(self) -> StorageConfig:
         self._ensure_loaded()
-        return self._storage  # type: ignore
+        if self._storage is None:
+            self._storage = self._parse_storage(self._raw.get("storage", {}))
+        return self._storage
 
     def get_llm(self) -> LLMSettings:
         self._ensure_loaded()
-        return self._llm  # type: ignore
+        if self._llm is None:
+            self._llm = self._parse_llm(self._raw.get("llm", {}))
+        return self._llm
+
+    def get_section(self, name: str) -> dict:
+        """返回尚无专用数据结构的原始配置段（如 auth）"""
+        self._ensure_loaded()
+        return self._raw.get(name) or {}
 
     def get_llm_role(self, role: str) -> tuple[ProviderSettings, str]:
         """返回 (ProviderSettings, model_name)，含自动 fallback 逻辑"""
-        self._ensure_loaded()
-        llm = self._llm  # type: ignore
+        llm = self.get_llm()
         role_cfg = llm.roles.get(role)
         if not role_cfg:
-            raise KeyError(f"LLM role '{role}' not found in settings.yaml")
+            raise KeyError(f"LLM role '{role}' not found in settings.toml")
 
         provider = llm.providers.get(role_cfg.provider)
         if not provider or not provider.enabled:
@@ -287,8 +338,7 @@ class AppSettings:
         return provider, model
 
     def list_enabled_providers(self) -> list[str]:
-        self._ensure_loaded()
-        return [n for n, p in (self._llm.providers if self._llm else {}).items() if p.enabled]
+        return [n for n, p in self.get_llm().providers.items() if p.enabled]
 
     def _ensure_loaded(self):
         if not self._loaded:
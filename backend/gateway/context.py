@@ -21,7 +21,7 @@ class TaskStatus(str, Enum):
     FAILED = "failed"
 
 
-@dataclass
+@dataclass(slots=True)
 class TaskContext:
     """
     一次错题处理任务的完整上下文。
@@ -68,8 +68,42 @@ class TaskContext:
         self.errors.append({"skill": skill, "message": message})
         self.status = TaskStatus.FAILED
 
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "TaskContext":
+        """
+        从 to_dict() 结果或外部 JSON 还原上下文（边界校验）。
+        未知字段忽略；status 字符串转回 TaskStatus，非法取值抛出 ValueError。
+        """
+        known = cls.__dataclass_fields__
+        kwargs = {k: v for k, v in data.items() if k in known}
+        if "status" in kwargs:
+            kwargs["status"] = TaskStatus(kwargs["status"])
+        return cls(**kwargs)
+
     def to_dict(self) -> dict:
-        import dataclasses
-        d = dataclasses.asdict(self)
-        d["status"] = self.status.value
-        return d
+        """浅序列化：容器字段直接引用，不做深拷贝（调用方不应修改返回值）"""
+        return {
+            "task_id": self.task_id,
+            "user_id": self.user_id,
+            "source": self.source,
+            "status": self.status.value,
+            "image_source": self.image_source,
+            "clean_question_image_url": self.clean_question_image_url,
+            "handwritten_answer_image_url": self.handwritten_answer_image_url,
+            "raw_question_text": self.raw_question_text,
+            "raw_answer_text": self.raw_answer_text,
+            "vision_confidence": self.vision_confidence,
+            "verified_question_text": self.verified_question_text,
+            "verified_answer_text": self.verified_answer_text,
+            "subject": self.subject,
+            "grade": self.grade,
+            "error_reason": self.error_reason,
+            "question_id": self.question_id,
+            "record_id": self.record_id,
+            "is_duplicate_question": self.is_duplicate_question,
+            "knowledge_nodes": self.knowledge_nodes,
+            "analysis_summary": self.analysis_summary,
+            "similar_question_keywords": self.similar_question_keywords,
+            "errors": self.errors,
+            "meta": self.meta,
+        }
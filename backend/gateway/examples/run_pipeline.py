@@ -66,8 +66,12 @@ def mock_cognitive_analysis(ctx: TaskContext) -> TaskContext:
 # ─────────────────────────────────────────────────────────────────────────────
 
 async def main():
-    # 1. 加载所有 Skills (扫描 SKILL.md)
-    registry.load_all()
+    # 1. 加载所有 Skills (扫描 SKILL.md)，同时构建 Pipeline（两者互不依赖，并发进行）
+    #    真实 handler 模块落地后，其 import 也可作为一个任务加入这里
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(asyncio.to_thread(registry.load_all))
+        pipeline_task = tg.create_task(asyncio.to_thread(build_default_pipeline))
+    pipeline = pipeline_task.result()
     print(f"\n已注册 Skills: {registry.list_skills()}\n")
 
     # 2. 绑定 Mock Handler 到各 Skill
@@ -75,9 +79,6 @@ async def main():
     registry.register_handler("ingest-and-verify", mock_ingest_and_verify)
     registry.register_handler("cognitive-analysis", mock_cognitive_analysis)
 
-    # 3. 构建默认 Pipeline
-    pipeline = build_default_pipeline()
-
     # ── 阶段 1：图像识别（执行后暂停等待人工校对）────────────────────────
     ctx = TaskContext(user_id="student_001", image_source="oss://bucket/raw/q1.jpg")
     print("=" * 60)
@@ -4,22 +4,83 @@ gateway/loader.py
 Skill 加载器：自动扫描 skills/ 目录，读取每个 SKILL.md 的 YAML frontmatter，
 将所有合法 Skill 注册到内存中，供 Orchestrator 按名称快速查找。
 """
+import asyncio
 import os
-import yaml
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Callable, Optional
 
 SKILLS_ROOT = Path(__file__).parent.parent / "skills"
 
+# frontmatter 通常是扁平的 key: value，逐行用正则提取；含嵌套/引号等复杂写法时才回退到 YAML
+_KV_RE = re.compile(rb"^([A-Za-z_][\w-]*)[ \t]*:[ \t]*(.*?)[ \t\r]*$")
+_NON_SCALAR_START = tuple(b"\"'[{|>&*!#%@`")
+# YAML 会解析成 null/bool/数字/日期的值（如 null、yes、123、2024-01-01），交给 YAML 以保证两条路径结果一致
+_TYPED_SCALAR_RE = re.compile(rb"(?i:~|null|true|false|yes|no|on|off)$|[-+.\d]")
 
-@dataclass
+
+def _parse_frontmatter(block: bytes) -> dict:
+    result: dict = {}
+    for line in block.splitlines():
+        if not line.strip() or line.lstrip().startswith(b"#"):
+            continue
+        m = _KV_RE.match(line)
+        if m is None:
+            return _yaml_load(block)
+        key, value = m.groups()
+        if (
+            not value or value[0] in _NON_SCALAR_START or b" #" in value or b": " in value
+            or _TYPED_SCALAR_RE.match(value)
+        ):
+            return _yaml_load(block)
+        result[key.decode()] = value.decode("utf-8")
+    return result
+
+
+# frontmatter 字段约束：{字段名: (类型, 是否必填)}，模块加载时确定，解析时只做一次遍历校验
+_SKILL_SCHEMA: dict[str, tuple[type, bool]] = {
+    "name": (str, True),
+    "description": (str, False),
+}
+
+
+def _validate_frontmatter(meta: object) -> dict:
+    """按 _SKILL_SCHEMA 校验 frontmatter，错误信息指明具体字段"""
+    if not isinstance(meta, dict):
+        raise ValueError("frontmatter 必须是 key: value 映射")
+    for key, (typ, required) in _SKILL_SCHEMA.items():
+        if key not in meta:
+            if required:
+                raise ValueError(f"缺少必填字段 '{key}'")
+            continue
+        if not isinstance(meta[key], typ):
+            raise ValueError(f"字段 '{key}' 应为 {typ.__name__}，实际为 {type(meta[key]).__name__}")
+    if not meta["name"]:
+        raise ValueError("字段 'name' 不能为空")
+    return meta
+
+
+def _yaml_load(block: bytes) -> dict:
+    import yaml
+    try:
+        from yaml import CSafeLoader as loader   # libyaml 加速
+    except ImportError:
+        from yaml import SafeLoader as loader
+    return yaml.load(block.decode("utf-8"), Loader=loader) or {}
+
+
+@dataclass(slots=True)
 class SkillMeta:
     """从 SKILL.md frontmatter 解析出的 Skill 元信息"""
     name: str
     description: str
     skill_dir: Path
     handler: Optional[Callable] = field(default=None, repr=False)
+    is_async: bool = False        # register_handler 时预先判定，执行时无需再检查
+    sync_inline: bool = False     # 同步 handler 直接在事件循环线程执行（仅适用于极快、不阻塞的 handler）
 
 
 class SkillRegistry:
@@ -27,34 +88,47 @@ class SkillRegistry:
 
     def __init__(self):
         self._registry: dict[str, SkillMeta] = {}
+        self.generation = 0   # 每次 load_all 递增，供缓存了 SkillMeta 的调用方判断是否失效
 
     def load_all(self) -> None:
         """扫描 skills/ 目录，将所有有效 Skill 注册进来"""
         self._registry.clear()
+        self.generation += 1
         if not SKILLS_ROOT.exists():
             raise FileNotFoundError(f"Skills 目录不存在: {SKILLS_ROOT}")
 
-        for skill_dir in sorted(SKILLS_ROOT.iterdir()):
-            if not skill_dir.is_dir():
-                continue
-            skill_md = skill_dir / "SKILL.md"
-            if not skill_md.exists():
-                continue
-            meta = self._parse_skill_md(skill_dir, skill_md)
-            if meta:
-                self._registry[meta.name] = meta
-                print(f"[SkillRegistry] ✅ Loaded skill: {meta.name}")
+        # scandir 自带 d_type，省去逐项 stat；读文件+解析交给线程池并发，注册仍在当前线程按名称顺序进行
+        with os.scandir(SKILLS_ROOT) as it:
+            dirs = sorted(e.name for e in it if e.is_dir())
+        candidates = [(SKILLS_ROOT / name, SKILLS_ROOT / name / "SKILL.md") for name in dirs]
+
+        with ThreadPoolExecutor(max_workers=8) as ex:
+            metas = ex.map(lambda c: self._parse_skill_md(*c), candidates)
+            for meta in metas:
+                if meta:
+                    self._registry[meta.name] = meta
+                    print(f"[SkillRegistry] ✅ Loaded skill: {meta.name}")
 
     def _parse_skill_md(self, skill_dir: Path, skill_md: Path) -> Optional[SkillMeta]:
         """解析 SKILL.md 文件的 YAML frontmatter"""
-        content = skill_md.read_text(encoding="utf-8")
-        if not content.startswith("---"):
+        try:
+            data = skill_md.read_bytes()
+        except FileNotFoundError:
+            return None
+        # 直接按偏移切出 frontmatter 块，不拆分整个文件
+        if data.startswith(b"---\n"):
+            start = 4
+        elif data.startswith(b"---\r\n"):
+            start = 5
+        else:
+            return None
+        end = data.find(b"\n---", start)
+        if end < 0:
             return None
         try:
-            _, frontmatter, _ = content.split("---", 2)
-            meta_dict = yaml.safe_load(frontmatter.strip())
+            meta_dict = _validate_frontmatter(_parse_frontmatter(data[start:end]))
             return SkillMeta(
-                name=meta_dict["name"],
+                name=sys.intern(meta_dict["name"]),
                 description=meta_dict.get("description", ""),
                 skill_dir=skill_dir,
             )
@@ -62,16 +136,29 @@ class SkillRegistry:
             print(f"[SkillRegistry] ❌ Failed to parse {skill_md}: {e}")
             return None
 
-    def register_handler(self, skill_name: str, handler: Callable) -> None:
-        """为已注册的 Skill 绑定运行时 handler 函数"""
+    def register_handler(self, skill_name: str, handler: Callable, sync_inline: bool = False) -> None:
+        """
+        为已注册的 Skill 绑定运行时 handler 函数。
+        sync_inline=True 时同步 handler 不再经 asyncio.to_thread 派发，省去线程切换开销，
+        但执行期间会阻塞事件循环——只应用于纯内存、微秒级的 handler。
+        """
+        skill_name = sys.intern(skill_name)
         if skill_name not in self._registry:
             raise KeyError(f"Skill '{skill_name}' 未注册，请先确认 SKILL.md 存在")
-        self._registry[skill_name].handler = handler
+        meta = self._registry[skill_name]
+        meta.handler = handler
+        meta.sync_inline = sync_inline
+        wrapped = getattr(handler, "__wrapped__", None)
+        meta.is_async = asyncio.iscoroutinefunction(handler) or (
+            wrapped is not None and asyncio.iscoroutinefunction(wrapped)
+        )
 
     def get(self, skill_name: str) -> SkillMeta:
-        if skill_name not in self._registry:
+        # 名称均已 intern，命中时字典比较退化为指针比较；单次查找代替 in + []
+        meta = self._registry.get(sys.intern(skill_name))
+        if meta is None:
             raise KeyError(f"Skill '{skill_name}' 未找到")
-        return self._registry[skill_name]
+        return meta
 
     def list_skills(self) -> list[str]:
         return list(self._registry.keys())
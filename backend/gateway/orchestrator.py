@@ -8,10 +8,11 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import sys
 from typing import Callable
 
 from .context import TaskContext, TaskStatus
-from .loader import registry
+from .loader import SkillMeta, registry
 
 logger = logging.getLogger("tiptoro.gateway")
 
@@ -26,47 +27,56 @@ class Step:
     支持：顺序执行、条件跳过、暂停等待（await_human）。
     """
 
+    __slots__ = ("skill_name", "await_human", "condition", "_meta", "_meta_gen")
+
     def __init__(
         self,
         skill_name: str,
         await_human: bool = False,
         condition: Callable[[TaskContext], bool] | None = None,
     ):
-        self.skill_name = skill_name
+        self.skill_name = sys.intern(skill_name)
         self.await_human = await_human  # True = 执行后暂停等待前端反馈
         self.condition = condition      # None = 始终执行
+        self._meta: SkillMeta | None = None   # 首次 run 时解析并缓存，registry 重新加载后失效
+        self._meta_gen = -1
 
     async def run(self, ctx: TaskContext) -> TaskContext:
         # 条件检查
         if self.condition and not self.condition(ctx):
-            logger.info(f"[Step:{self.skill_name}] skipped (condition=False)")
+            logger.info("[Step:%s] skipped (condition=False)", self.skill_name)
             return ctx
 
-        meta = registry.get(self.skill_name)
+        meta = self._meta
+        if meta is None or self._meta_gen != registry.generation:
+            meta = self._meta = registry.get(self.skill_name)
+            self._meta_gen = registry.generation
         if meta.handler is None:
             raise RuntimeError(
                 f"Skill '{self.skill_name}' 已注册但尚未绑定 handler。"
                 "请调用 registry.register_handler() 完成绑定。"
             )
 
-        logger.info(f"[Step:{self.skill_name}] ▶ starting | task_id={ctx.task_id}")
+        logger.info("[Step:%s] ▶ starting | task_id=%s", self.skill_name, ctx.task_id)
         ctx.status = TaskStatus.RUNNING
 
         try:
-            if asyncio.iscoroutinefunction(meta.handler):
+            if meta.is_async:
                 ctx = await meta.handler(ctx)
+            elif meta.sync_inline:
+                ctx = meta.handler(ctx)
             else:
                 ctx = await asyncio.to_thread(meta.handler, ctx)
         except Exception as e:
             ctx.add_error(self.skill_name, str(e))
-            logger.error(f"[Step:{self.skill_name}] ❌ error: {e}")
+            logger.error("[Step:%s] ❌ error: %s", self.skill_name, e)
             return ctx
 
-        logger.info(f"[Step:{self.skill_name}] ✅ done")
+        logger.info("[Step:%s] ✅ done", self.skill_name)
 
         if self.await_human:
             ctx.status = TaskStatus.AWAITING_HUMAN
-            logger.info(f"[Step:{self.skill_name}] ⏸ paused — awaiting human verification")
+            logger.info("[Step:%s] ⏸ paused — awaiting human verification", self.skill_name)
 
         return ctx
 
@@ -87,8 +97,12 @@ class Orchestrator:
         ctx = await orch.run(ctx)
     """
 
+    __slots__ = ("_steps", "_compiled", "_step_index")
+
     def __init__(self):
         self._steps: list[Step] = []
+        self._compiled: tuple[Step, ...] | None = None   # 首次 run 时冻结，add_step 后失效
+        self._step_index: dict[str, int] = {}             # skill_name → 首次出现的位置
 
     def add_step(
         self,
@@ -98,8 +112,15 @@ class Orchestrator:
     ) -> "Orchestrator":
         """链式添加 Step，返回 self 以支持方法链调用"""
         self._steps.append(Step(skill_name, await_human=await_human, condition=condition))
+        self._step_index.setdefault(skill_name, len(self._steps) - 1)
+        self._compiled = None
         return self
 
+    def _compile(self) -> tuple[Step, ...]:
+        if self._compiled is None:
+            self._compiled = tuple(self._steps)
+        return self._compiled
+
     async def run(
         self,
         ctx: TaskContext,
@@ -110,18 +131,18 @@ class Orchestrator:
         - resume_after: 若不为 None，则跳过该 skill_name 之前（含）的所有步骤，
           用于在人工校对完成后「续跑」后半段 Pipeline。
         """
-        skip = resume_after is not None
-        for step in self._steps:
-            if skip:
-                if step.skill_name == resume_after:
-                    skip = False   # 从这一步开始恢复执行（跳过此 step）
-                continue
+        steps = self._compile()
+        start = 0
+        if resume_after is not None:
+            # 未知的 resume_after 与原先逐个比对的行为一致：不执行任何步骤
+            start = self._step_index.get(resume_after, len(steps) - 1) + 1
 
+        for step in steps[start:]:
             ctx = await step.run(ctx)
 
             # 遇到错误立即熔断
             if ctx.status == TaskStatus.FAILED:
-                logger.error(f"[Orchestrator] Pipeline halted at skill='{step.skill_name}'")
+                logger.error("[Orchestrator] Pipeline halted at skill='%s'", step.skill_name)
                 return ctx
 
             # 遇到等待人工校对的暂停点立即返回
@@ -131,7 +152,7 @@ class Orchestrator:
         if ctx.status == TaskStatus.RUNNING:
             ctx.status = TaskStatus.COMPLETED
 
-        logger.info(f"[Orchestrator] 🏁 Pipeline completed | task_id={ctx.task_id}")
+        logger.info("[Orchestrator] 🏁 Pipeline completed | task_id=%s", ctx.task_id)
         return ctx
 
 
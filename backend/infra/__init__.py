@@ -4,6 +4,7 @@ infra/__init__.py
 from .config import infra_config, InfraConfig, DatabaseConfig, StorageConfig
 from .database import get_engine, get_session, init_db, health_check, Base
 from .storage import get_storage, StorageClient
+from .request_cache import request_scope, cached_get
 
 __all__ = [
     "infra_config",
@@ -17,4 +18,6 @@ __all__ = [
     "Base",
     "get_storage",
     "StorageClient",
+    "request_scope",
+    "cached_get",
 ]
@@ -14,6 +14,7 @@ infra/database.py
 """
 from __future__ import annotations
 
+import os
 from contextlib import contextmanager
 from typing import Generator
 
@@ -24,7 +25,9 @@ from .config import infra_config
 
 # SQLAlchemy ORM Base（所有 Model 继承此类）
 class Base(DeclarativeBase):
-    pass
+    # 时间戳由数据库生成（server_default / onupdate），flush 时经 RETURNING 一并取回，
+    # 会话关闭后仍可直接读取，不会触发过期刷新
+    __mapper_args__ = {"eager_defaults": True}
 
 
 _engine: Engine | None = None
@@ -36,31 +39,42 @@ def get_engine() -> Engine:
     global _engine
     if _engine is None:
         db_cfg = infra_config.get_db_config()
-        kwargs: dict = {"echo": db_cfg.echo_sql}
+        # 编译缓存：模型/查询种类多于默认的 500 条时避免反复编译 SQL
+        kwargs: dict = {"echo": db_cfg.echo_sql, "query_cache_size": 1200}
         if db_cfg.driver == "postgresql":
             kwargs["pool_size"] = db_cfg.pool_size
             kwargs["max_overflow"] = db_cfg.max_overflow
+            kwargs["pool_pre_ping"] = True     # 取出连接前探活，避免使用被服务端断开的连接
+            kwargs["pool_recycle"] = 3600      # 一小时回收，规避中间件/防火墙的空闲超时
         elif db_cfg.driver == "sqlite":
             # SQLite 多线程支持
             kwargs["connect_args"] = {"check_same_thread": False}
+            # 数据库文件所在目录只在创建 Engine 时确保存在一次
+            os.makedirs(os.path.dirname(db_cfg.url.removeprefix("sqlite:///")), exist_ok=True)
 
         _engine = create_engine(db_cfg.url, **kwargs)
+        _init_session_factory(_engine)
         print(f"[DB] ✅ Engine ready | driver={db_cfg.driver} | env={infra_config.active_env}")
     return _engine
 
 
-def get_session_factory() -> sessionmaker:
+def _init_session_factory(engine: Engine) -> None:
+    """与 Engine 同时创建，全局唯一一处初始化"""
     global _SessionFactory
+    # expire_on_commit=False：提交后读取已加载属性无需再查库（会话在 get_session 退出时即关闭）
+    _SessionFactory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+
+def get_session_factory() -> sessionmaker:
     if _SessionFactory is None:
-        _SessionFactory = sessionmaker(bind=get_engine(), autoflush=False, autocommit=False)
-    return _SessionFactory
+        get_engine()
+    return _SessionFactory  # type: ignore[return-value]
 
 
 @contextmanager
 def get_session() -> Generator[Session, None, None]:
     """上下文管理器：自动 commit/rollback"""
-    factory = get_session_factory()
-    session: Session = factory()
+    session: Session = (_SessionFactory or get_session_factory())()
     try:
         yield session
         session.commit()
@@ -71,10 +85,24 @@ def get_session() -> Generator[Session, None, None]:
         session.close()
 
 
+def dialect_insert(session: Session):
+    """按当前数据库方言选择支持 ON CONFLICT / RETURNING 的 insert 构造器"""
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
 def init_db() -> None:
     """建表（首次运行或 local 开发时使用）"""
+    from .models import backfill_mistakes_count
+
     engine = get_engine()
     Base.metadata.create_all(engine)
+    # 对齐错题计数器（覆盖升级前的数据和绕过 ORM 的批量增删）
+    with engine.begin() as conn:
+        backfill_mistakes_count(conn)
     print(f"[DB] 📦 Tables initialized | driver={infra_config.get_db_config().driver}")
 
 
@@ -6,19 +6,50 @@ SQLAlchemy ORM 数据模型定义。
 """
 from __future__ import annotations
 
-from datetime import datetime
+import hashlib
+from datetime import datetime, timezone
 
 from sqlalchemy import (
-    BigInteger, Boolean, DateTime, Enum, Float, ForeignKey,
-    Integer, String, Text, func
+    JSON, BigInteger, Boolean, DateTime, Enum, Float, ForeignKey, Index,
+    Integer, LargeBinary, String, Text, TypeDecorator, event, func, inspect,
+    literal_column, select, update,
 )
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column, relationship, selectinload, undefer_group
 
-from .database import Base
+from .database import Base, dialect_insert
+from .request_cache import invalidate
 
 import enum
 
 
+# ──────────────────────────────────────────────────────────────────────────────
+# 列类型
+# ──────────────────────────────────────────────────────────────────────────────
+
+class UTCDateTime(TypeDecorator):
+    """
+    以 naive UTC 存储、以 aware UTC 读出的 DateTime。
+    SQLite 不保存时区信息，统一在类型层补齐，业务代码无需再判断 tzinfo。
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
+
+# JSON 数组列：PostgreSQL 用 JSONB（可建 GIN 索引做 @> 包含查询），SQLite 用 JSON
+JSONList = JSON().with_variant(JSONB(), "postgresql")
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # 枚举
 # ──────────────────────────────────────────────────────────────────────────────
@@ -76,11 +107,17 @@ class User(Base):
     avatar_url: Mapped[str] = mapped_column(Text, nullable=True)
     email_verified: Mapped[bool] = mapped_column(Boolean, default=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime, server_default=func.now())
 
+    # 错题记录无上限，不做默认急加载；需要时用 USER_HISTORY_OPTIONS 显式 selectinload
     mistake_records: Mapped[list["UserMistakeRecord"]] = relationship(back_populates="user")
-    profile: Mapped["UserProfile"] = relationship(back_populates="user", uselist=False)
-    auth_providers: Mapped[list["AuthProvider"]] = relationship(back_populates="user")
+    # 1:1 与少量行的关联随 User 一并加载，避免访问时逐条查询（N+1）
+    profile: Mapped["UserProfile"] = relationship(back_populates="user", uselist=False, lazy="joined")
+    auth_providers: Mapped[list["AuthProvider"]] = relationship(back_populates="user", lazy="selectin")
+
+
+# 注册时依赖此唯一索引拒绝重复邮箱（大小写不敏感）
+Index("ix_user_email_lower", func.lower(User.email), unique=True)
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -92,10 +129,13 @@ class EmailVerificationToken(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
-    token: Mapped[str] = mapped_column(String(64), unique=True, nullable=False, index=True)
-    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    # 只存 BLAKE2b(token) 的 16 字节摘要，原始 token 仅出现在发给用户的链接中
+    token_hash: Mapped[bytes] = mapped_column(LargeBinary(16), unique=True, nullable=False, index=True)
+    expires_at: Mapped[datetime] = mapped_column(UTCDateTime, nullable=False)
     used: Mapped[bool] = mapped_column(Boolean, default=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime, server_default=func.now())
+
+    user: Mapped["User"] = relationship()
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -112,7 +152,7 @@ class UserProfile(Base):
     weak_subjects: Mapped[str] = mapped_column(Text, nullable=True)         # JSON 数组
     learning_style: Mapped[str] = mapped_column(String(50), nullable=True)  # visual/auditory/etc
     personality_notes: Mapped[str] = mapped_column(Text, nullable=True)     # 自由文字
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
+    updated_at: Mapped[datetime] = mapped_column(UTCDateTime, server_default=func.now(), onupdate=func.now())
 
     user: Mapped["User"] = relationship(back_populates="profile")
 
@@ -123,17 +163,24 @@ class UserProfile(Base):
 
 class AuthProvider(Base):
     __tablename__ = "auth_providers"
+    __table_args__ = (
+        # 一个外部账号只能绑定一个用户；登录按 (provider, provider_uid) 查 user_id，
+        # PG 上 INCLUDE user_id 后可仅扫索引返回，无需回表
+        Index(
+            "uq_auth_provider_uid", "provider", "provider_uid",
+            unique=True, postgresql_include=["user_id"],
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     provider: Mapped[str] = mapped_column(String(20), nullable=False)       # email | phone | wechat
     provider_uid: Mapped[str] = mapped_column(String(200), nullable=False)  # 邮箱 / 手机号 / openid
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime, server_default=func.now())
 
     user: Mapped["User"] = relationship(back_populates="auth_providers")
 
 
-
 # ──────────────────────────────────────────────────────────────────────────────
 # 错题处理任务表（生命周期跟踪）
 # ──────────────────────────────────────────────────────────────────────────────
@@ -141,16 +188,25 @@ class AuthProvider(Base):
 class QuestionTask(Base):
     """每次上传一张图片对应一条 Task 记录"""
     __tablename__ = "question_tasks"
+    __table_args__ = (
+        # 按状态轮询某用户的任务
+        Index("ix_qt_user_status_created", "user_id", "status", "created_at"),
+        # 增量同步：WHERE updated_at > :ts ORDER BY updated_at
+        Index("ix_qt_updated", "updated_at"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     task_id: Mapped[str] = mapped_column(String(36), unique=True, nullable=False, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     source: Mapped[str] = mapped_column(String(20), default="web")  # web | feishu | wecom
-    status: Mapped[str] = mapped_column(String(30), default="pending")
+    # PG 上为原生 ENUM（4 字节），SQLite 退化为 VARCHAR，取值在绑定时校验
+    status: Mapped[TaskStatusEnum] = mapped_column(
+        Enum(TaskStatusEnum, name="task_status"), default=TaskStatusEnum.pending
+    )
     original_image_url: Mapped[str] = mapped_column(Text, nullable=True)
     error_message: Mapped[str] = mapped_column(Text, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), onupdate=func.now())
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(UTCDateTime, server_default=func.now(), onupdate=func.now())
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -162,15 +218,50 @@ class Question(Base):
     __tablename__ = "questions"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    content_hash: Mapped[str] = mapped_column(String(64), unique=True, index=True)  # SHA256
+    content_hash: Mapped[str] = mapped_column(String(64), unique=True, index=True)  # BLAKE2b-256 hex
     clean_text: Mapped[str] = mapped_column(Text, nullable=False)   # 含 LaTeX
     clean_image_url: Mapped[str] = mapped_column(Text, nullable=True)
     subject: Mapped[str] = mapped_column(String(30), nullable=True)
     grade: Mapped[str] = mapped_column(String(20), nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime, server_default=func.now())
 
+    # 同一道题被大量学生共用，同样不做默认急加载
     mistake_records: Mapped[list["UserMistakeRecord"]] = relationship(back_populates="question")
 
+    @staticmethod
+    def hash_content(text: str) -> str:
+        """
+        计算题目去重哈希，入库前预先算好写入 content_hash。
+        BLAKE2b-256 来自标准库，比 SHA256 快且输出同为 64 位十六进制。
+        """
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=32).hexdigest()
+
+    @classmethod
+    def upsert_by_hash(cls, session, content_hash: str, clean_text: str, **kw) -> tuple[int, bool]:
+        """
+        按 content_hash 去重写入，返回 (question_id, 是否新建)。
+        并发上传同一道题不会再出现先查后插的竞态。
+        - PostgreSQL：冲突时做一次无实际变化的 UPDATE，RETURNING 总能带回 id，
+          xmax = 0 即本次为插入，一次往返完成
+        - SQLite：DO NOTHING RETURNING，仅在重复时补一次按哈希查 id
+        """
+        insert = dialect_insert(session)
+        stmt = insert(cls).values(content_hash=content_hash, clean_text=clean_text, **kw)
+        if session.get_bind().dialect.name == "postgresql":
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[cls.content_hash],
+                set_={"content_hash": stmt.excluded.content_hash},
+            ).returning(cls.id, literal_column("xmax = 0"))
+            question_id, inserted = session.execute(stmt).one()
+            return question_id, bool(inserted)
+
+        stmt = stmt.on_conflict_do_nothing(index_elements=[cls.content_hash]).returning(cls.id)
+        question_id = session.execute(stmt).scalar()
+        if question_id is not None:
+            return question_id, True
+        existing = session.execute(select(cls.id).where(cls.content_hash == content_hash)).scalar_one()
+        return existing, False
+
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 学生错题记录（核心业务表）
@@ -178,6 +269,15 @@ class Question(Base):
 
 class UserMistakeRecord(Base):
     __tablename__ = "user_mistake_records"
+    __table_args__ = (
+        # 错题时间线分页；前导列 user_id 同时服务按用户计数
+        Index("ix_umr_user_created", "user_id", "created_at"),
+        # 同一用户的重复题目检测
+        Index("ix_umr_user_question", "user_id", "question_id"),
+        # 按知识点反查错题：knowledge_nodes @> '["X"]'，仅 PostgreSQL 建
+        Index("ix_umr_knodes_gin", "knowledge_nodes", postgresql_using="gin")
+        .ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -189,19 +289,37 @@ class UserMistakeRecord(Base):
     wrong_answer_image_url: Mapped[str] = mapped_column(Text, nullable=True)   # 手写截图
 
     # 人工标注
-    error_reason: Mapped[str] = mapped_column(String(30), nullable=True)
-
-    # AI 分析结果
-    knowledge_nodes: Mapped[str] = mapped_column(Text, nullable=True)   # JSON 数组字符串
-    analysis_summary: Mapped[str] = mapped_column(Text, nullable=True)
-    similar_keywords: Mapped[str] = mapped_column(Text, nullable=True)  # JSON 数组字符串
-
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    error_reason: Mapped[ErrorReasonEnum] = mapped_column(
+        Enum(ErrorReasonEnum, name="error_reason"), nullable=True
+    )
+
+    # AI 分析结果：列表页用不到，默认延迟加载；首次访问任一列时整组一次取回，
+    # 详情页用 UMR_DETAIL_OPTIONS 随主查询一并加载
+    knowledge_nodes: Mapped[list[str]] = mapped_column(
+        JSONList, nullable=True, deferred=True, deferred_group="analysis"
+    )
+    analysis_summary: Mapped[str] = mapped_column(
+        Text, nullable=True, deferred=True, deferred_group="analysis"
+    )
+    similar_keywords: Mapped[list[str]] = mapped_column(
+        JSONList, nullable=True, deferred=True, deferred_group="analysis"
+    )
+
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime, server_default=func.now())
 
     user: Mapped["User"] = relationship(back_populates="mistake_records")
     question: Mapped["Question"] = relationship(back_populates="mistake_records")
 
 
+# 读取用户完整错题历史（含题目）时使用：两条 IN 查询代替逐条懒加载
+USER_HISTORY_OPTIONS = (
+    selectinload(User.mistake_records).selectinload(UserMistakeRecord.question),
+)
+
+# 错题详情页：连同 AI 分析结果一起查出（会话关闭后再访问延迟列会报 DetachedInstanceError）
+UMR_DETAIL_OPTIONS = (undefer_group("analysis"),)
+
+
 # ──────────────────────────────────────────────────────────────────────────────
 # 知识点标签树
 # ──────────────────────────────────────────────────────────────────────────────
@@ -228,9 +346,11 @@ class Subscription(Base):
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), unique=True, nullable=False, index=True)
     plan_id: Mapped[str] = mapped_column(String(20), nullable=False)        # trial | monthly | annual
     status: Mapped[str] = mapped_column(String(20), default="active")       # active | expired | cancelled
-    activated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
-    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=func.now())
+    activated_at: Mapped[datetime] = mapped_column(UTCDateTime, nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(UTCDateTime, nullable=False)
+    # 错题数计数器：由下方 UserMistakeRecord 的 mapper 事件在同一事务内维护，配额检查 O(1) 读取
+    mistakes_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime, server_default=func.now())
 
 
 class ActivationKey(Base):
@@ -240,9 +360,60 @@ class ActivationKey(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     nonce: Mapped[str] = mapped_column(String(20), unique=True, nullable=False, index=True)
     plan_id: Mapped[str] = mapped_column(String(20), nullable=False)
-    raw_key_hash: Mapped[str] = mapped_column(String(64), nullable=False)   # SHA256(key)，用于审计
+    raw_key_hash: Mapped[bytes] = mapped_column(LargeBinary(16), nullable=False)  # 以 BILLING_SECRET 为密钥的 BLAKE2b-16(key)，用于审计
     note: Mapped[str] = mapped_column(String(200), nullable=True)           # 生成时的备注
-    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
-    activated_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(UTCDateTime, nullable=False, server_default=func.now())
+    activated_at: Mapped[datetime] = mapped_column(UTCDateTime, nullable=True)
+    # 认领走 nonce 唯一索引上的单条 upsert（WHERE used_by_user_id IS NULL），无需额外的“未使用”索引
     used_by_user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
 
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 错题计数器维护（Subscription.mistakes_count）
+# ──────────────────────────────────────────────────────────────────────────────
+# 经 ORM 增删 UserMistakeRecord 时自动在 flush 连接上更新计数，调用方无需手动维护。
+# 注意：session.execute(delete(...)) / Query.delete() 等批量语句不触发 mapper 事件，
+# 之后需调用 backfill_mistakes_count() 重新对齐。
+
+def _bump_mistakes_count(connection, user_id: int, delta: int) -> None:
+    connection.execute(
+        update(Subscription.__table__)
+        .where(Subscription.user_id == user_id)
+        .values(mistakes_count=Subscription.mistakes_count + delta)
+    )
+    # 丢弃本请求内缓存的订阅状态（billing.subscription.get_status），配额检查读到新计数
+    invalidate(("subscription_status", user_id))
+
+
+@event.listens_for(UserMistakeRecord, "after_insert")
+def _on_mistake_insert(mapper, connection, target: UserMistakeRecord) -> None:
+    _bump_mistakes_count(connection, target.user_id, 1)
+
+
+@event.listens_for(UserMistakeRecord, "after_delete")
+def _on_mistake_delete(mapper, connection, target: UserMistakeRecord) -> None:
+    _bump_mistakes_count(connection, target.user_id, -1)
+
+
+@event.listens_for(UserMistakeRecord, "after_update")
+def _on_mistake_update(mapper, connection, target: UserMistakeRecord) -> None:
+    # 错题改归属用户时，两边的计数各自调整
+    history = inspect(target).attrs.user_id.history
+    if history.has_changes():
+        for old in history.deleted:
+            _bump_mistakes_count(connection, old, -1)
+        for new in history.added:
+            _bump_mistakes_count(connection, new, 1)
+
+
+def backfill_mistakes_count(connection) -> None:
+    """
+    按错题表重新计算所有订阅的计数（init_db 时执行，也用于批量增删之后）。
+    旧库需先补列：ALTER TABLE subscriptions ADD COLUMN mistakes_count INTEGER NOT NULL DEFAULT 0
+    """
+    counts = (
+        select(func.count(UserMistakeRecord.id))
+        .where(UserMistakeRecord.user_id == Subscription.user_id)
+        .scalar_subquery()
+    )
+    connection.execute(update(Subscription.__table__).values(mistakes_count=counts))
@@ -0,0 +1,63 @@
+"""
+infra/request_cache.py
+
+请求级查询缓存：同一次请求内多处按主键读同一对象（鉴权、业务处理、权限检查），
+只在第一次真正访问数据库。
+
+使用方法（API 层在每个请求外包一层 request_scope）：
+    from infra.request_cache import request_scope, cached_get
+
+    with request_scope():
+        user = cached_get(session, User, user_id)   # 查库
+        user = cached_get(session, User, user_id)   # 命中缓存
+
+不在 request_scope 内调用时不做任何缓存，行为与直接查询一致。
+缓存随作用域结束丢弃，不跨请求共享，也就不存在过期问题；
+请求内的写操作需调用 invalidate() 让后续读取看到新值。
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Hashable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_cache: ContextVar[dict | None] = ContextVar("tiptoro_request_cache", default=None)
+
+
+@contextmanager
+def request_scope() -> Iterator[dict]:
+    """开启一个请求级缓存作用域（支持嵌套，内层独立）"""
+    token = _cache.set({})
+    try:
+        yield _cache.get()
+    finally:
+        _cache.reset(token)
+
+
+def memoize(key: Hashable, loader: Callable[[], T]) -> T:
+    """在当前请求作用域内按 key 缓存 loader() 的结果；无作用域时直接调用"""
+    cache = _cache.get()
+    if cache is None:
+        return loader()
+    try:
+        return cache[key]
+    except KeyError:
+        value = cache[key] = loader()
+        return value
+
+
+def cached_get(session, model: type[T], pk: Any) -> T | None:
+    """
+    按主键读取 ORM 对象，同一请求内重复读取直接返回首次结果。
+    session 关闭后对象处于 detached 状态，只应访问已加载的属性。
+    """
+    return memoize((model.__name__, pk), lambda: session.get(model, pk))
+
+
+def invalidate(key: Hashable) -> None:
+    """写操作后丢弃当前作用域内的缓存项"""
+    cache = _cache.get()
+    if cache is not None:
+        cache.pop(key, None)
@@ -11,18 +11,27 @@ infra/storage.py
 
     storage = get_storage()
     url = storage.put("raw/user_1/q1.jpg", image_bytes, content_type="image/jpeg")
+    with open("big.pdf", "rb") as f:
+        url = storage.put_stream("raw/user_1/big.pdf", f, content_type="application/pdf")
     data = storage.get("raw/user_1/q1.jpg")
     storage.delete("raw/user_1/q1.jpg")
 """
 from __future__ import annotations
 
+import logging
 import os
 import shutil
+import threading
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import BinaryIO, Optional
+
+from cachetools import TTLCache
 
 from .config import infra_config, StorageConfig
 
+logger = logging.getLogger("tiptoro.storage")
+
 
 class StorageClient(ABC):
     """统一存储客户端抽象基类"""
@@ -32,9 +41,22 @@ class StorageClient(ABC):
         """上传文件，返回可访问的 URL"""
         ...
 
+    def put_stream(
+        self,
+        key: str,
+        fileobj: BinaryIO,
+        content_type: str = "application/octet-stream",
+        size_hint: int | None = None,
+    ) -> str:
+        """
+        从文件对象流式上传，返回可访问的 URL。
+        默认实现退化为整体读入后 put()；各实现按自身 SDK 覆盖为分块/分片上传。
+        """
+        return self.put(key, fileobj.read(), content_type=content_type)
+
     @abstractmethod
     def get(self, key: str) -> bytes:
-        """按 key 下载文件，返回字节内容"""
+        """按 key 下载文件，返回字节内容；不存在时统一抛出 FileNotFoundError"""
         ...
 
     @abstractmethod
@@ -47,11 +69,47 @@ class StorageClient(ABC):
         """检查文件是否存在"""
         ...
 
+    def version(self, key: str) -> Optional[str]:
+        """
+        返回文件的版本标记（本地为 mtime，云端为 ETag），不存在时返回 None。
+        只读元数据、不下载内容，供上层按版本缓存文件派生结果（子类可覆盖）。
+        """
+        raise NotImplementedError
+
     def public_url(self, key: str) -> str:
         """返回文件的可访问 URL（子类可覆盖）"""
         raise NotImplementedError
 
 
+class _ExistsCache:
+    """
+    云存储 exists() 结果的 TTL 缓存（含负缓存）。
+    去重上传时同一 key 会被反复检查（重试、分片），命中即可省掉一次 HEAD 往返。
+    put 成功写入 True，delete 时失效。
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 60):
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bool | None:
+        with self._lock:
+            return self._cache.get(key)
+
+    def set(self, key: str, value: bool) -> None:
+        with self._lock:
+            self._cache[key] = value
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+
+# 大文件分片上传参数（OSS / S3 共用）
+_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+_MULTIPART_CONCURRENCY = 4
+
+
 # ── 本地文件系统实现 ────────────────────────────────────────────
 
 class LocalStorageClient(StorageClient):
@@ -61,33 +119,87 @@ class LocalStorageClient(StorageClient):
         self.root = Path(cfg.root_dir).resolve()
         self.root.mkdir(parents=True, exist_ok=True)
         self.base_url = cfg.base_url.rstrip("/")
-        print(f"[Storage] 📁 LocalStorage root={self.root}")
+        self._url_prefix = self.base_url + "/"
+        # 已确认存在的目录，写入时命中即跳过 mkdir（见 _ensure_parent）
+        self._known_dirs: set[Path] = {self.root}
+        logger.info("[Storage] 📁 LocalStorage root=%s", self.root)
 
     def _path(self, key: str) -> Path:
-        p = (self.root / key).resolve()
-        p.parent.mkdir(parents=True, exist_ok=True)
-        return p
+        # root 已在构造时 resolve；key 由业务代码拼出，不再逐级 realpath（每次省掉一串 lstat）
+        return self.root / key
+
+    def _ensure_parent(self, path: Path) -> None:
+        """确保父目录存在；已确认过的目录直接跳过 mkdir"""
+        parent = path.parent
+        if parent not in self._known_dirs:
+            parent.mkdir(parents=True, exist_ok=True)
+            self._known_dirs.add(parent)
 
     def put(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> str:
-        self._path(key).write_bytes(data)
+        p = self._path(key)
+        self._ensure_parent(p)
+        # 直接 os.open + os.write，省掉 Path.write_bytes 的 io 包装层
+        fd = os.open(p, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
         return self.public_url(key)
 
-    def get(self, key: str) -> bytes:
+    def put_stream(
+        self,
+        key: str,
+        fileobj: BinaryIO,
+        content_type: str = "application/octet-stream",
+        size_hint: int | None = None,
+    ) -> str:
         p = self._path(key)
-        if not p.exists():
-            raise FileNotFoundError(f"LocalStorage: key not found: {key}")
-        return p.read_bytes()
+        self._ensure_parent(p)
+        with p.open("wb") as out:
+            shutil.copyfileobj(fileobj, out, _MULTIPART_THRESHOLD)
+        return self.public_url(key)
+
+    def get(self, key: str) -> bytes:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"LocalStorage: key not found: {key}") from None
+
+    def open(self, key: str) -> BinaryIO:
+        """
+        以只读二进制方式打开文件，供 HTTP 层直接按文件对象/路径回传（可走 sendfile 零拷贝），
+        避免先 get() 把整张图片读进内存。
+        """
+        try:
+            return self._path(key).open("rb")
+        except FileNotFoundError:
+            raise FileNotFoundError(f"LocalStorage: key not found: {key}") from None
+
+    def copy(self, src_key: str, dst_key: str) -> str:
+        """本地复制；shutil.copyfile 在 Linux 上走 sendfile，内容不经过用户态"""
+        dst = self._path(dst_key)
+        self._ensure_parent(dst)
+        shutil.copyfile(self._path(src_key), dst)
+        return self.public_url(dst_key)
 
     def delete(self, key: str) -> None:
-        p = self._path(key)
-        if p.exists():
-            p.unlink()
+        self._path(key).unlink(missing_ok=True)
 
     def exists(self, key: str) -> bool:
         return self._path(key).exists()
 
+    def version(self, key: str) -> Optional[str]:
+        # 仅用 mtime 时，时间戳精度较粗的文件系统上同一刻度内的改写不可区分；并入大小与 inode
+        try:
+            st = self._path(key).stat()
+        except FileNotFoundError:
+            return None
+        return f"{st.st_mtime_ns}-{st.st_size}-{st.st_ino}"
+
     def public_url(self, key: str) -> str:
-        return f"{self.base_url}/{key}"
+        return self._url_prefix + key
 
 
 # ── 阿里云 OSS 实现 ─────────────────────────────────────────────
@@ -104,25 +216,72 @@ class AliyunOSSClient(StorageClient):
         auth = oss2.Auth(cfg.access_key_id, cfg.access_key_secret)
         self.bucket = oss2.Bucket(auth, cfg.endpoint, cfg.bucket)
         self.base_url = cfg.base_url.rstrip("/")
-        print(f"[Storage] ☁ AliyunOSS bucket={cfg.bucket} region={cfg.region}")
+        self._url_prefix = self.base_url + "/"
+        self._exists_cache = _ExistsCache()
+        logger.info("[Storage] ☁ AliyunOSS bucket=%s region=%s", cfg.bucket, cfg.region)
 
     def put(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> str:
         self.bucket.put_object(key, data, headers={"Content-Type": content_type})
+        self._exists_cache.set(key, True)
+        return self.public_url(key)
+
+    def put_stream(
+        self,
+        key: str,
+        fileobj: BinaryIO,
+        content_type: str = "application/octet-stream",
+        size_hint: int | None = None,
+    ) -> str:
+        import oss2
+        headers = {"Content-Type": content_type}
+        path = getattr(fileobj, "name", None)
+        if (
+            isinstance(path, str) and os.path.isfile(path)
+            and (size_hint or os.path.getsize(path)) >= _MULTIPART_THRESHOLD
+        ):
+            # 磁盘上的大文件：分片并发上传（可断点续传）
+            oss2.resumable_upload(
+                self.bucket, key, path,
+                headers=headers,
+                multipart_threshold=_MULTIPART_THRESHOLD,
+                num_threads=_MULTIPART_CONCURRENCY,
+            )
+        else:
+            # 其他文件对象交给 SDK 边读边发，不在内存里拼完整 bytes
+            self.bucket.put_object(key, fileobj, headers=headers)
+        self._exists_cache.set(key, True)
         return self.public_url(key)
 
     def get(self, key: str) -> bytes:
-        result = self.bucket.get_object(key)
+        import oss2
+        try:
+            result = self.bucket.get_object(key)
+        except oss2.exceptions.NoSuchKey:
+            raise FileNotFoundError(f"AliyunOSS: key not found: {key}") from None
         return result.read()
 
     def delete(self, key: str) -> None:
         self.bucket.delete_object(key)
+        self._exists_cache.discard(key)
 
     def exists(self, key: str) -> bool:
+        cached = self._exists_cache.get(key)
+        if cached is not None:
+            return cached
+        # object_exists 只发一次 HEAD 请求
+        found = self.bucket.object_exists(key)
+        self._exists_cache.set(key, found)
+        return found
+
+    def version(self, key: str) -> Optional[str]:
         import oss2
-        return oss2.ObjectExists(self.bucket, key)
+        try:
+            return self.bucket.head_object(key).etag
+        except oss2.exceptions.NotFound:
+            return None
 
     def public_url(self, key: str) -> str:
-        return f"{self.base_url}/{key}"
+        return self._url_prefix + key
 
 
 # ── AWS S3 实现 ─────────────────────────────────────────────────
@@ -133,6 +292,7 @@ class AWSS3Client(StorageClient):
     def __init__(self, cfg: StorageConfig):
         try:
             import boto3
+            from botocore.config import Config
         except ImportError:
             raise ImportError("AWS S3 需要安装 boto3：pip install boto3")
 
@@ -141,31 +301,80 @@ class AWSS3Client(StorageClient):
             region_name=cfg.region,
             aws_access_key_id=cfg.access_key_id,
             aws_secret_access_key=cfg.secret_access_key,
+            # 交给 botocore 自带的重试（含退避），不在业务层重复实现
+            config=Config(retries={"mode": "standard", "max_attempts": 3}),
         )
         self.bucket_name = cfg.bucket
         self.base_url = cfg.base_url.rstrip("/")
-        print(f"[Storage] ☁ AWSS3 bucket={cfg.bucket} region={cfg.region}")
+        self._url_prefix = self.base_url + "/"
+        self._exists_cache = _ExistsCache()
+        logger.info("[Storage] ☁ AWSS3 bucket=%s region=%s", cfg.bucket, cfg.region)
 
     def put(self, key: str, data: bytes, content_type: str = "application/octet-stream") -> str:
         self._s3.put_object(Bucket=self.bucket_name, Key=key, Body=data, ContentType=content_type)
+        self._exists_cache.set(key, True)
+        return self.public_url(key)
+
+    def put_stream(
+        self,
+        key: str,
+        fileobj: BinaryIO,
+        content_type: str = "application/octet-stream",
+        size_hint: int | None = None,
+    ) -> str:
+        from boto3.s3.transfer import TransferConfig
+        self._s3.upload_fileobj(
+            fileobj, self.bucket_name, key,
+            ExtraArgs={"ContentType": content_type},
+            Config=TransferConfig(
+                multipart_threshold=_MULTIPART_THRESHOLD,
+                multipart_chunksize=_MULTIPART_THRESHOLD,
+                max_concurrency=_MULTIPART_CONCURRENCY,
+                use_threads=True,
+            ),
+        )
+        self._exists_cache.set(key, True)
         return self.public_url(key)
 
     def get(self, key: str) -> bytes:
-        obj = self._s3.get_object(Bucket=self.bucket_name, Key=key)
+        try:
+            obj = self._s3.get_object(Bucket=self.bucket_name, Key=key)
+        except self._s3.exceptions.NoSuchKey:
+            raise FileNotFoundError(f"AWSS3: key not found: {key}") from None
         return obj["Body"].read()
 
     def delete(self, key: str) -> None:
         self._s3.delete_object(Bucket=self.bucket_name, Key=key)
+        self._exists_cache.discard(key)
 
     def exists(self, key: str) -> bool:
+        cached = self._exists_cache.get(key)
+        if cached is not None:
+            return cached
+        from botocore.exceptions import ClientError
         try:
             self._s3.head_object(Bucket=self.bucket_name, Key=key)
-            return True
+        except ClientError as e:
+            # 只有明确的 404 才写入负缓存，其他错误（权限、限流）不缓存
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                self._exists_cache.set(key, False)
+            return False
         except Exception:
             return False
+        self._exists_cache.set(key, True)
+        return True
+
+    def version(self, key: str) -> Optional[str]:
+        from botocore.exceptions import ClientError
+        try:
+            return self._s3.head_object(Bucket=self.bucket_name, Key=key)["ETag"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
 
     def public_url(self, key: str) -> str:
-        return f"{self.base_url}/{key}"
+        return self._url_prefix + key
 
 
 # ── 工厂函数 ────────────────────────────────────────────────────
@@ -5,7 +5,7 @@ llm/__init__.py
 """
 from .config import llm_config, LLMConfig
 from .providers.base import Message, CompletionRequest, CompletionResponse
-from .client import llm_call
+from .client import llm_call, llm_acall, llm_acall_many
 from config.loader import ProviderSettings as ProviderConfig, GenerationDefaults
 
 __all__ = [
@@ -17,4 +17,6 @@ __all__ = [
     "CompletionRequest",
     "CompletionResponse",
     "llm_call",
+    "llm_acall",
+    "llm_acall_many",
 ]
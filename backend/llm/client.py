@@ -16,23 +16,156 @@ llm/client.py
         json_mode=True,
     )
     print(response.content)              # str 格式的模型输出
+
+异步 / 并发（多个角色互不依赖时，总耗时取决于最慢的一次调用）：
+
+    resp = await llm_acall(role="text_cleanup", messages=[...])
+    cleanup, analysis = await llm_acall_many([
+        {"role": "text_cleanup", "messages": [...]},
+        {"role": "cognitive_analysis", "messages": [...], "json_mode": True},
+    ])
+
+响应缓存：temperature <= 0.1 的请求视为确定性调用，按请求内容哈希缓存在进程内 LRU 中；
+设置 LLM_CACHE_REDIS_URL 且安装了 redis 时，额外写入 Redis 供多个 worker 共享
+（TTL 由 LLM_CACHE_TTL 控制，默认 86400 秒）。命中时 response.cached 为 True，raw 为 None。
 """
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+import dataclasses
+import hashlib
+import os
+import threading
+from typing import Any, Optional
+
+from cachetools import LRUCache
 
 from .config import llm_config, ProviderConfig
 from .providers import build_provider, Message, CompletionRequest, CompletionResponse
+from .providers.base import json_dumps, json_loads
 
-# Provider 实例缓存：避免每次调用都重新构建 HTTP Session
-_provider_cache: dict[str, object] = {}
+# Provider 实例缓存：避免每次调用都重新构建 HTTP Session。
+# 以影响连接行为的配置字段为键，轮换 API Key / 改 base_url 后自动构建新实例，不会拿到旧配置
+_provider_cache: dict[tuple, object] = {}
 
 
 def _get_provider(cfg: ProviderConfig):
     """获取或创建 provider 实例（懒加载 + 缓存）"""
-    if cfg.name not in _provider_cache:
-        _provider_cache[cfg.name] = build_provider(cfg)
-    return _provider_cache[cfg.name]
+    key = (cfg.name, cfg.api_key, cfg.base_url, cfg.timeout, cfg.max_retries)
+    provider = _provider_cache.get(key)
+    if provider is None:
+        provider = _provider_cache[key] = build_provider(cfg)
+    return provider
+
+
+def clear_provider_cache() -> None:
+    """丢弃全部已构建的 provider（测试中重新加载配置后调用）"""
+    _provider_cache.clear()
+
+
+# ── 响应缓存 ──────────────────────────────────────────────────────
+
+_CACHE_MAX_TEMPERATURE = 0.1
+_response_cache: LRUCache = LRUCache(maxsize=1024)
+_response_cache_lock = threading.Lock()
+_redis = None   # None = 未初始化；False = 未配置或不可用
+# Redis 只是二级缓存：超时设短，Redis 卡住时降级为未命中，而不是拖住 LLM 调用
+_REDIS_TIMEOUT = 0.5
+
+
+def _get_redis():
+    global _redis
+    if _redis is None:
+        url = os.environ.get("LLM_CACHE_REDIS_URL", "")
+        try:
+            import redis
+            _redis = redis.Redis.from_url(
+                url, socket_timeout=_REDIS_TIMEOUT, socket_connect_timeout=_REDIS_TIMEOUT,
+            ) if url else False
+        except ImportError:
+            _redis = False
+    return _redis
+
+
+def _cache_key(provider_name: str, request: CompletionRequest) -> Optional[str]:
+    """仅确定性请求（低温度）可缓存，其余返回 None"""
+    if request.temperature > _CACHE_MAX_TEMPERATURE:
+        return None
+    canonical = json_dumps(
+        {
+            "p": provider_name,
+            "m": request.model,
+            "msgs": [(m.role, m.content) for m in request.messages],
+            "t": request.temperature,
+            "mx": request.max_tokens,
+            "tp": request.top_p,
+            "j": request.json_mode,
+            "x": request.extra,
+        },
+        sort_keys=True,
+    )
+    return "llm:" + hashlib.sha256(canonical).hexdigest()
+
+
+def _cache_get(key: str) -> Optional[CompletionResponse]:
+    hit = _local_get(key)
+    if hit is None and _get_redis():
+        hit = _redis_get(key)
+    return hit
+
+
+async def _acache_get(key: str) -> Optional[CompletionResponse]:
+    """_cache_get 的异步版本：Redis 网络 I/O 放到线程中，不阻塞事件循环"""
+    hit = _local_get(key)
+    if hit is None and _get_redis():
+        hit = await asyncio.to_thread(_redis_get, key)
+    return hit
+
+
+def _cache_put(key: str, resp: CompletionResponse) -> None:
+    entry = _local_put(key, resp)
+    if _get_redis():
+        _redis_put(key, entry)
+
+
+async def _acache_put(key: str, resp: CompletionResponse) -> None:
+    entry = _local_put(key, resp)
+    if _get_redis():
+        await asyncio.to_thread(_redis_put, key, entry)
+
+
+def _local_get(key: str) -> Optional[CompletionResponse]:
+    with _response_cache_lock:
+        hit = _response_cache.get(key)
+    return dataclasses.replace(hit) if hit is not None else None
+
+
+def _local_put(key: str, resp: CompletionResponse) -> CompletionResponse:
+    entry = dataclasses.replace(resp, raw=None, cached=True)
+    with _response_cache_lock:
+        _response_cache[key] = entry
+    return entry
+
+
+def _redis_get(key: str) -> Optional[CompletionResponse]:
+    try:
+        blob = _get_redis().get(key)
+        if not blob:
+            return None
+        hit = CompletionResponse(**json_loads(blob))
+    except Exception:
+        # 连接错误、损坏条目或字段变更前写入的旧条目（ValueError / TypeError）一律按未命中处理
+        return None
+    with _response_cache_lock:
+        _response_cache[key] = hit
+    return dataclasses.replace(hit)
+
+
+def _redis_put(key: str, entry: CompletionResponse) -> None:
+    try:
+        _get_redis().setex(key, int(os.environ.get("LLM_CACHE_TTL", "86400")), json_dumps(dataclasses.asdict(entry)))
+    except Exception:
+        pass   # Redis 只是二级缓存，写入失败不影响本次调用
 
 
 def llm_call(
@@ -61,6 +194,54 @@ def llm_call(
     Returns:
         CompletionResponse  (content, model, provider, token counts, raw)
     """
+    provider, request = _prepare(role, messages, temperature, max_tokens, top_p, json_mode, extra)
+    key = _cache_key(provider.name, request)
+    if key and (hit := _cache_get(key)):
+        return hit
+    resp = provider.complete(request)
+    if key:
+        _cache_put(key, resp)
+    return resp
+
+
+async def llm_acall(
+    role: str,
+    messages: list[Message],
+    *,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    top_p: Optional[float] = None,
+    json_mode: bool = False,
+    extra: Optional[dict] = None,
+) -> CompletionResponse:
+    """llm_call 的异步版本，参数与返回值相同"""
+    provider, request = _prepare(role, messages, temperature, max_tokens, top_p, json_mode, extra)
+    key = _cache_key(provider.name, request)
+    if key and (hit := await _acache_get(key)):
+        return hit
+    resp = await provider.acomplete(request)
+    if key:
+        await _acache_put(key, resp)
+    return resp
+
+
+async def llm_acall_many(calls: list[dict[str, Any]]) -> list[CompletionResponse]:
+    """
+    并发执行多个互不依赖的调用，按传入顺序返回结果。
+    calls 中每一项是 llm_acall 的关键字参数字典；任一调用失败则抛出异常。
+    """
+    return await asyncio.gather(*(llm_acall(**c) for c in calls))
+
+
+def _prepare(
+    role: str,
+    messages: list[Message],
+    temperature: Optional[float],
+    max_tokens: Optional[int],
+    top_p: Optional[float],
+    json_mode: bool,
+    extra: Optional[dict],
+) -> tuple[Any, CompletionRequest]:
     # 1. 从 config 获取目标 provider 和 model（含 fallback 逻辑）
     provider_cfg, model = llm_config.get_role_config(role)
 
@@ -78,6 +259,5 @@ def llm_call(
         extra=extra or {},
     )
 
-    # 4. 获取 provider 适配器并调用
-    provider = _get_provider(provider_cfg)
-    return provider.complete(request)
+    # 4. 获取 provider 适配器
+    return _get_provider(provider_cfg), request
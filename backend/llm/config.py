@@ -20,7 +20,7 @@ class LLMConfig:
     def get_provider(self, name: str) -> ProviderConfig:
         llm = app_settings.get_llm()
         if name not in llm.providers:
-            raise KeyError(f"Provider '{name}' not found in settings.yaml")
+            raise KeyError(f"Provider '{name}' not found in settings.toml")
         return llm.providers[name]
 
     def get_defaults(self) -> GenerationDefaults:
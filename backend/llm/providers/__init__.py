@@ -9,6 +9,7 @@ from .deepseek import DeepSeekProvider
 from .gemini import GeminiProvider
 from .openai_compat import OpenAICompatProvider
 from .minimax import MiniMaxProvider
+from .batch import batch_complete
 
 
 def build_provider(cfg: ProviderConfig) -> BaseProvider:
@@ -28,6 +29,7 @@ def build_provider(cfg: ProviderConfig) -> BaseProvider:
 
 __all__ = [
     "build_provider",
+    "batch_complete",
     "BaseProvider",
     "Message",
     "CompletionRequest",
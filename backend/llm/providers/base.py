@@ -6,9 +6,38 @@ llm/providers/base.py
 """
 from __future__ import annotations
 
+import asyncio
+import json
+import random
+import weakref
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Optional
+from functools import cache, lru_cache
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+# JSON 编解码：优先 orjson（C 实现，快数倍），未安装时退回标准库。
+# 输出均为 UTF-8 bytes；sort_keys=True 用于生成缓存键等需要稳定字节序的场景
+try:
+    import orjson
+
+    def json_dumps(obj, *, sort_keys: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+
+    json_loads = orjson.loads
+except ImportError:
+    def json_dumps(obj, *, sort_keys: bool = False) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, sort_keys=sort_keys).encode("utf-8")
+
+    json_loads = json.loads
+
+# 原生异步 HTTP：安装 httpx 时 acomplete 直接在事件循环上并发，否则退回线程池
+try:
+    import httpx
+except ImportError:
+    httpx = None
 
 
 @dataclass
@@ -39,6 +68,7 @@ class CompletionResponse:
     input_tokens: int = 0
     output_tokens: int = 0
     raw: Optional[dict] = None    # 原始 API 响应，供调试
+    cached: bool = False          # True = 命中响应缓存，未实际调用 API
 
 
 class BaseProvider(ABC):
@@ -46,11 +76,245 @@ class BaseProvider(ABC):
 
     def __init__(self, name: str):
         self.name = name
+        self._session = None
+        self._gates: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncGate] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def session(self) -> "requests.Session":
+        """
+        按 provider 实例复用的 HTTP 连接池（Keep-Alive）。
+        Provider 实例由 llm.client 缓存，连续调用无需重复 TCP/TLS 握手。
+        """
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            # pool_maxsize 需大于线程池并发数（to_thread 默认最多 32 个线程），
+            # 否则高并发时多出来的连接会在用完后被丢弃，下次又要重新握手
+            # 重试交给 urllib3 在连接层完成：退避抖动、Retry-After 解析都由它处理，
+            # 重试时不再重新执行 Python 侧的请求组装
+            adapter = HTTPAdapter(
+                pool_connections=32, pool_maxsize=64,
+                max_retries=_retry_policy(self.cfg.max_retries),  # type: ignore[attr-defined]
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            # 请求体由 _post_json 自行序列化，Content-Type 统一在会话层设置
+            session.headers["Content-Type"] = "application/json"
+            self._session = session
+        return self._session
 
     @abstractmethod
     def complete(self, request: CompletionRequest) -> CompletionResponse:
         """同步调用，发送 messages，返回 CompletionResponse"""
         ...
 
+    async def acomplete(self, request: CompletionRequest) -> CompletionResponse:
+        """
+        异步调用。
+        - 已安装 httpx 且 provider 实现了 _prepare/_parse：走共享的 httpx.AsyncClient，不占线程
+        - 否则把 complete() 放到线程池执行（连接池可容纳 64 个并发连接）
+        并发数与速率受 cfg.extra 中 max_concurrency（默认 32）/ qpm（默认不限）约束，
+        避免 gather 大批请求时把 provider 打出 429。
+        """
+        async with self._gate():
+            if httpx is not None and type(self)._prepare is not BaseProvider._prepare:
+                url, payload, headers = self._prepare(request)
+                data = await self._apost_json(url, payload, headers=headers)
+                return self._parse(data, request)
+            return await asyncio.to_thread(self.complete, request)
+
+    def _gate(self) -> _AsyncGate:
+        """当前事件循环上的并发/限速闸门（asyncio 原语绑定创建时的循环，按循环各建一个）"""
+        loop = asyncio.get_running_loop()
+        gate = self._gates.get(loop)
+        if gate is None:
+            extra = getattr(getattr(self, "cfg", None), "extra", None) or {}
+            gate = self._gates[loop] = _AsyncGate(
+                int(extra.get("max_concurrency", 32)), float(extra.get("qpm", 0)),
+            )
+        return gate
+
+    def _prepare(self, request: CompletionRequest) -> tuple[str, dict, Optional[dict]]:
+        """构造 (url, payload, headers)，供同步/异步两条路径共用（子类可选实现）"""
+        raise NotImplementedError
+
+    def _parse(self, data: dict, request: CompletionRequest) -> CompletionResponse:
+        """把响应 JSON 转成 CompletionResponse（与 _prepare 配套实现）"""
+        raise NotImplementedError
+
+    def _post_json(self, url: str, payload: dict, *, headers: Optional[dict] = None, label: str = "") -> dict:
+        """
+        POST 并返回解析后的 JSON（子类需提供 self.cfg）。
+        重试由会话上挂载的 urllib3 Retry 完成（见 _retry_policy），这里只负责把最终失败转成 RuntimeError。
+        """
+        import requests
+
+        label = label or self.name
+        cfg = self.cfg  # type: ignore[attr-defined]
+        try:
+            # 连接超时单独设短，读超时沿用配置
+            resp = self.session.post(url, headers=headers, data=json_dumps(payload), timeout=(3, cfg.timeout))
+            resp.raise_for_status()
+            return json_loads(resp.content)
+        except requests.HTTPError as e:
+            raise RuntimeError(f"[{label}] 调用失败（HTTP {e.response.status_code}）: {e}") from e
+        except requests.RequestException as e:
+            raise RuntimeError(f"[{label}] 调用失败（已重试 {cfg.max_retries - 1} 次）: {e}") from e
+        except ValueError as e:   # 解析失败不重试（见 _retry_policy）
+            raise RuntimeError(f"[{label}] 响应不是合法 JSON: {e}") from e
+
+    async def _apost_json(self, url: str, payload: dict, *, headers: Optional[dict] = None, label: str = "") -> dict:
+        """
+        _post_json 的 httpx 异步版本。httpx 没有等价的状态码重试，仍在此处循环，
+        策略与 _retry_policy 保持一致：
+        - 4xx（408/429 除外）属于请求本身的问题，立即失败不重试
+        - 429/503 优先遵循 Retry-After，其余按全抖动指数退避
+        - 响应体不是合法 JSON 时立即失败
+        """
+        label = label or self.name
+        cfg = self.cfg  # type: ignore[attr-defined]
+        client = _async_client()
+        body = json_dumps(payload)
+        timeout = httpx.Timeout(cfg.timeout, connect=3)
+        for attempt in range(1, cfg.max_retries + 1):
+            try:
+                resp = await client.post(url, headers=headers, content=body, timeout=timeout)
+                resp.raise_for_status()
+                return json_loads(resp.content)
+            except httpx.HTTPStatusError as e:
+                error: Exception = e
+                delay = _http_error_delay(e.response, attempt, label, e)
+            except httpx.HTTPError as e:
+                error = e
+                delay = _backoff(attempt)
+            except ValueError as e:   # 解析失败不重试，与同步路径一致
+                raise RuntimeError(f"[{label}] 响应不是合法 JSON: {e}") from e
+            if attempt == cfg.max_retries:
+                raise RuntimeError(f"[{label}] 调用失败（重试 {attempt} 次）: {error}") from error
+            await asyncio.sleep(delay)
+        raise RuntimeError(f"[{label}] 未配置重试次数（max_retries < 1）")
+
     def __repr__(self) -> str:
         return f"<Provider:{self.name}>"
+
+
+class _AsyncGate:
+    """信号量限制同时在途的请求数；qpm > 0 时再按固定间隔放行，平滑到 provider 的配额"""
+
+    __slots__ = ("_sem", "_interval", "_next_at")
+
+    def __init__(self, max_concurrency: int, qpm: float):
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self._interval = 60.0 / qpm if qpm > 0 else 0.0
+        self._next_at = 0.0
+
+    async def __aenter__(self) -> None:
+        await self._sem.acquire()
+        if self._interval:
+            # 单线程事件循环内读写 _next_at 之间没有 await，无需加锁
+            now = asyncio.get_running_loop().time()
+            slot = max(now, self._next_at)
+            self._next_at = slot + self._interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+
+    async def __aexit__(self, *exc) -> None:
+        self._sem.release()
+
+
+# 可重试的状态码：超时、限流和网关类错误；其余 4xx 属于请求本身的问题
+_RETRY_STATUSES = frozenset((408, 429, 500, 502, 503, 504))
+# Retry-After 最长遵循 60 秒，避免服务端给出超长等待时把调用方（及 provider 并发名额）挂住
+_RETRY_AFTER_MAX = 60.0
+
+
+@cache
+def _capped_retry_cls():
+    """Retry-After 截断到 _RETRY_AFTER_MAX 的 urllib3 Retry（urllib3 原生对该值不设上限）"""
+    from urllib3.util.retry import Retry
+
+    class _CappedRetry(Retry):
+        def get_retry_after(self, response):
+            retry_after = super().get_retry_after(response)
+            return None if retry_after is None else min(retry_after, _RETRY_AFTER_MAX)
+
+    return _CappedRetry
+
+
+def _retry_policy(max_retries: int):
+    """
+    requests 会话使用的 urllib3 重试策略。max_retries 沿用配置语义（总尝试次数），
+    连接错误、读超时和 _RETRY_STATUSES 都计入同一额度；
+    429/503 遵循 Retry-After（最长 60 秒），其余按指数退避（上限 30 秒）并附加抖动。
+    """
+    Retry = _capped_retry_cls()
+    kwargs: dict = dict(
+        total=max(max_retries - 1, 0),
+        backoff_factor=1.0,
+        status_forcelist=_RETRY_STATUSES,
+        allowed_methods=frozenset(["POST"]),   # LLM 接口均为 POST，默认不在重试范围内
+        respect_retry_after_header=True,
+        raise_on_status=False,                 # 用完额度后返回最后一次响应，由 raise_for_status 统一抛错
+    )
+    try:
+        return Retry(**kwargs, backoff_max=30, backoff_jitter=1.0)
+    except TypeError:  # urllib3 < 2.0 不支持抖动参数
+        return Retry(**kwargs)
+
+
+def _http_error_delay(resp, attempt: int, label: str, error: Exception) -> float:
+    """
+    HTTP 错误的重试等待时间（requests / httpx 响应对象通用）。
+    - 4xx（408/429 除外）属于请求本身的问题，直接抛出不重试
+    - 429/503 优先遵循 Retry-After，其余按全抖动指数退避
+    """
+    status = resp.status_code
+    if 400 <= status < 500 and status not in (408, 429):
+        raise RuntimeError(f"[{label}] 调用失败（HTTP {status}，不重试）: {error}") from error
+    return _retry_after(resp, attempt) if status in (429, 503) else _backoff(attempt)
+
+
+# 每个事件循环一个 AsyncClient：连接绑定在创建它的循环上，跨 asyncio.run 不能复用
+_async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _async_client() -> "httpx.AsyncClient":
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = httpx.AsyncClient(
+            headers={"Content-Type": "application/json"},
+            limits=httpx.Limits(max_connections=256, max_keepalive_connections=64),
+        )
+    return client
+
+
+def _backoff(attempt: int) -> float:
+    """全抖动指数退避：在 [1, min(2^attempt, 30)] 秒内均匀取值，各客户端的重试时刻自然错开"""
+    return random.uniform(1.0, min(2 ** attempt, 30))
+
+
+def _retry_after(resp, attempt: int) -> float:
+    """
+    解析 Retry-After（秒数形式），附加 0~1 秒抖动；最长等待 60 秒。
+    缺失或为 HTTP 日期时退回指数退避。
+    """
+    try:
+        return min(float(resp.headers.get("Retry-After", "")), _RETRY_AFTER_MAX) + random.random()
+    except ValueError:
+        return _backoff(attempt)
+
+
+@lru_cache(maxsize=256)
+def chat_message(role: str, content: str) -> dict:
+    """
+    ChatCompletion 风格的消息 dict。同一 system prompt 会被反复发送，
+    缓存后不再逐次重建；返回值是共享对象，调用方只读不改。
+    """
+    return {"role": role, "content": content}
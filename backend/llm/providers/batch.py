@@ -0,0 +1,34 @@
+"""
+llm/providers/batch.py
+
+同一请求并发发送给多个 Provider（多模型对比、取最快结果等场景）。
+先全部发出再统一等待，总耗时约等于最慢的那一个，而不是逐个相加。
+
+使用示例：
+    import asyncio
+    from llm.providers import build_provider, batch_complete
+
+    results = asyncio.run(batch_complete([deepseek, gemini], request))
+    for r in results:
+        if isinstance(r, Exception):
+            ...
+"""
+from __future__ import annotations
+
+import asyncio
+
+from .base import BaseProvider, CompletionRequest, CompletionResponse
+
+
+async def batch_complete(
+    providers: list[BaseProvider],
+    request: CompletionRequest,
+) -> list[CompletionResponse | BaseException]:
+    """
+    并发调用各 provider 的 acomplete，按传入顺序返回结果。
+    单个 provider 失败不影响其他调用，对应位置返回异常对象，由调用方逐个判断。
+    """
+    return await asyncio.gather(
+        *(p.acomplete(request) for p in providers),
+        return_exceptions=True,
+    )
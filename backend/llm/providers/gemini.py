@@ -6,11 +6,6 @@ Google Gemini 适配器。通过 REST API 调用 generateContent 接口。
 """
 from __future__ import annotations
 
-import json
-import time
-
-import requests
-
 from .base import BaseProvider, CompletionRequest, CompletionResponse
 from ..config import ProviderConfig
 
@@ -20,6 +15,16 @@ class GeminiProvider(BaseProvider):
     def __init__(self, cfg: ProviderConfig):
         super().__init__("gemini")
         self.cfg = cfg
+        self._urls: dict[str, str] = {}   # model → generateContent URL
+
+    def _url(self, model: str) -> str:
+        url = self._urls.get(model)
+        if url is None:
+            url = self._urls[model] = (
+                f"{self.cfg.base_url}/models/{model}:generateContent"
+                f"?key={self.cfg.api_key}"
+            )
+        return url
 
     def _build_contents(self, messages: list) -> tuple[str | None, list]:
         """将 ChatCompletion messages 转为 Gemini contents 格式，system 单独提取"""
@@ -35,6 +40,10 @@ class GeminiProvider(BaseProvider):
         return system_instruction, contents
 
     def complete(self, request: CompletionRequest) -> CompletionResponse:
+        url, payload, headers = self._prepare(request)
+        return self._parse(self._post_json(url, payload, headers=headers, label="Gemini"), request)
+
+    def _prepare(self, request: CompletionRequest) -> tuple[str, dict, None]:
         system_instruction, contents = self._build_contents(request.messages)
 
         payload: dict = {
@@ -49,28 +58,20 @@ class GeminiProvider(BaseProvider):
             payload["systemInstruction"] = {"parts": [{"text": system_instruction}]}
         if request.json_mode:
             payload["generationConfig"]["responseMimeType"] = "application/json"
+        # API Key 在 URL 查询参数中，无需额外请求头
+        return self._url(request.model), payload, None
 
-        url = (
-            f"{self.cfg.base_url}/models/{request.model}:generateContent"
-            f"?key={self.cfg.api_key}"
+    def _parse(self, data: dict, request: CompletionRequest) -> CompletionResponse:
+        try:
+            content = data["candidates"][0]["content"]["parts"][0]["text"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise RuntimeError(f"[Gemini] 响应格式异常: {e}") from e
+        usage = data.get("usageMetadata", {})
+        return CompletionResponse(
+            content=content,
+            model=request.model,
+            provider="gemini",
+            input_tokens=usage.get("promptTokenCount", 0),
+            output_tokens=usage.get("candidatesTokenCount", 0),
+            raw=data,
         )
-
-        for attempt in range(1, self.cfg.max_retries + 1):
-            try:
-                resp = requests.post(url, json=payload, timeout=self.cfg.timeout)
-                resp.raise_for_status()
-                data = resp.json()
-                content = data["candidates"][0]["content"]["parts"][0]["text"]
-                usage = data.get("usageMetadata", {})
-                return CompletionResponse(
-                    content=content,
-                    model=request.model,
-                    provider="gemini",
-                    input_tokens=usage.get("promptTokenCount", 0),
-                    output_tokens=usage.get("candidatesTokenCount", 0),
-                    raw=data,
-                )
-            except Exception as e:
-                if attempt == self.cfg.max_retries:
-                    raise RuntimeError(f"[Gemini] 调用失败（重试 {attempt} 次）: {e}") from e
-                time.sleep(2 ** attempt)
@@ -7,13 +7,20 @@ DeepSeek、OpenAI、Grok (xAI) 均兼容 OpenAI ChatCompletion API，
 """
 from __future__ import annotations
 
-import time
+import asyncio
+import concurrent.futures
+import threading
+from contextlib import aclosing, closing
+from typing import AsyncIterator, Iterator
 
-import requests
-
-from .base import BaseProvider, CompletionRequest, CompletionResponse
+from .base import (
+    BaseProvider, CompletionRequest, CompletionResponse,
+    _async_client, chat_message, httpx, json_dumps, json_loads,
+)
 from ..config import ProviderConfig
 
+_SSE_DONE = object()
+
 
 class OpenAICompatProvider(BaseProvider):
     """通用 OpenAI 兼容适配器，OpenAI / Grok 共用此类"""
@@ -21,15 +28,21 @@ class OpenAICompatProvider(BaseProvider):
     def __init__(self, cfg: ProviderConfig, provider_name: str):
         super().__init__(provider_name)
         self.cfg = cfg
-
-    def complete(self, request: CompletionRequest) -> CompletionResponse:
-        headers = {
-            "Authorization": f"Bearer {self.cfg.api_key}",
+        # 请求头与 URL 在实例生命周期内不变，构造时算好
+        self._headers = {
+            "Authorization": f"Bearer {cfg.api_key}",
             "Content-Type": "application/json",
         }
+        self._url = f"{cfg.base_url}/chat/completions"
+
+    def complete(self, request: CompletionRequest) -> CompletionResponse:
+        url, payload, headers = self._prepare(request)
+        return self._parse(self._post_json(url, payload, headers=headers), request)
+
+    def _prepare(self, request: CompletionRequest) -> tuple[str, dict, dict]:
         payload: dict = {
             "model": request.model,
-            "messages": [{"role": m.role, "content": m.content} for m in request.messages],
+            "messages": [chat_message(m.role, m.content) for m in request.messages],
             "temperature": request.temperature,
             "max_tokens": request.max_tokens,
             "top_p": request.top_p,
@@ -37,30 +50,135 @@ class OpenAICompatProvider(BaseProvider):
         if request.json_mode:
             payload["response_format"] = {"type": "json_object"}
         payload.update(request.extra)
+        return self._url, payload, self._headers
+
+    def _parse(self, data: dict, request: CompletionRequest) -> CompletionResponse:
+        try:
+            content = data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise RuntimeError(f"[{self.name}] 响应格式异常: {e}") from e
+        usage = data.get("usage", {})
+        return CompletionResponse(
+            content=content,
+            model=data.get("model", request.model),
+            provider=self.name,
+            input_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            raw=data,
+        )
+
+    # ── 流式输出（SSE）────────────────────────────────────────────
+    # 会话层的 urllib3 重试只作用于拿到响应之前（连接失败、429/5xx 状态码）；
+    # 流一旦开始输出就无法安全重放，读取中途出错直接抛出
+
+    def stream(self, request: CompletionRequest) -> Iterator[str]:
+        """同步流式调用，逐段产出增量文本（首 token 即可开始渲染）"""
+        url, payload, headers = self._prepare(request)
+        payload["stream"] = True
+        resp = self.session.post(
+            url, headers=headers, data=json_dumps(payload), stream=True, timeout=(3, self.cfg.timeout),
+        )
+        with resp:
+            if resp.status_code >= 400:
+                raise RuntimeError(f"[{self.name}] 流式调用失败（HTTP {resp.status_code}）: {resp.text[:200]}")
+            resp.encoding = "utf-8"   # text/event-stream 常不带 charset，避免按 ISO-8859-1 解码中文
+            for line in resp.iter_lines(decode_unicode=True):
+                delta = _sse_delta(line)
+                if delta is _SSE_DONE:
+                    break
+                if delta:
+                    yield delta
 
-        for attempt in range(1, self.cfg.max_retries + 1):
+    async def astream(self, request: CompletionRequest) -> AsyncIterator[str]:
+        """
+        异步流式调用。安装 httpx 时直接在事件循环上读取 SSE；
+        否则在后台线程跑 stream()，经队列转交增量文本。
+        """
+        async with self._gate():
+            if httpx is None:
+                # 显式 aclose：astream 被提前关闭时，后台线程也随之停止
+                async with aclosing(_iterate_in_thread(self.stream, request)) as deltas:
+                    async for delta in deltas:
+                        yield delta
+                return
+
+            url, payload, headers = self._prepare(request)
+            payload["stream"] = True
+            async with _async_client().stream(
+                "POST", url, headers=headers, content=json_dumps(payload),
+                timeout=httpx.Timeout(self.cfg.timeout, connect=3),
+            ) as resp:
+                if resp.status_code >= 400:
+                    body = await resp.aread()
+                    raise RuntimeError(f"[{self.name}] 流式调用失败（HTTP {resp.status_code}）: {body[:200]!r}")
+                async for line in resp.aiter_lines():
+                    delta = _sse_delta(line)
+                    if delta is _SSE_DONE:
+                        break
+                    if delta:
+                        yield delta
+
+
+def _sse_delta(line: str):
+    """解析一行 SSE：返回增量文本、None（非数据行/无内容）或 _SSE_DONE（结束标记）"""
+    if not line.startswith("data:"):
+        return None
+    data = line[5:].strip()
+    if data == "[DONE]":
+        return _SSE_DONE
+    choices = json_loads(data).get("choices") or ()
+    if not choices:
+        return None
+    return (choices[0].get("delta") or {}).get("content")
+
+
+async def _iterate_in_thread(gen_func, *args, maxsize: int = 64) -> AsyncIterator[str]:
+    """
+    在线程中消费同步生成器，经有界 asyncio.Queue 把结果交回事件循环。
+    消费方提前结束（break / aclose / 取消）时通知线程停止并关闭生成器，
+    上游响应随之关闭，不会在后台继续读完整个流。
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize)
+    stop = threading.Event()
+    end = object()
+
+    def _put(item) -> bool:
+        # 队列满时阻塞等待（背压），期间定期检查消费方是否已退出
+        try:
+            fut = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        except RuntimeError:   # 事件循环已关闭
+            return False
+        while True:
+            try:
+                fut.result(timeout=0.1)
+                return True
+            except concurrent.futures.TimeoutError:
+                if stop.is_set():
+                    fut.cancel()
+                    return False
+            except concurrent.futures.CancelledError:
+                return False
+
+    def _pump() -> None:
+        with closing(gen_func(*args)) as gen:
             try:
-                resp = requests.post(
-                    f"{self.cfg.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=self.cfg.timeout,
-                )
-                resp.raise_for_status()
-                data = resp.json()
-                content = data["choices"][0]["message"]["content"]
-                usage = data.get("usage", {})
-                return CompletionResponse(
-                    content=content,
-                    model=data.get("model", request.model),
-                    provider=self.name,
-                    input_tokens=usage.get("prompt_tokens", 0),
-                    output_tokens=usage.get("completion_tokens", 0),
-                    raw=data,
-                )
-            except Exception as e:
-                if attempt == self.cfg.max_retries:
-                    raise RuntimeError(
-                        f"[{self.name}] 调用失败（重试 {attempt} 次）: {e}"
-                    ) from e
-                time.sleep(2 ** attempt)
+                for item in gen:
+                    if stop.is_set() or not _put(item):
+                        return
+            except BaseException as e:  # noqa: BLE001 - 异常交回事件循环侧抛出
+                _put(e)
+                return
+        _put(end)
+
+    threading.Thread(target=_pump, daemon=True).start()
+    try:
+        while True:
+            item = await queue.get()
+            if item is end:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
@@ -20,7 +20,12 @@ AI 上下文构建器。
 """
 from __future__ import annotations
 
-from users.space import read_soul, read_user_profile_md
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from infra.storage import get_storage
+from users.space import _key, read_soul, read_user_profile_md
 
 _CONTEXT_TEMPLATE = """\
 ## 当前用户上下文
@@ -37,6 +42,14 @@ _CONTEXT_TEMPLATE = """\
 请始终根据以上背景信息调整你的回答风格和内容。
 """
 
+# 模版在导入时切成固定片段，构建时直接拼接，省去每次 str.format 解析占位符
+_CTX_HEAD, _rest = _CONTEXT_TEMPLATE.split("{soul}")
+_CTX_MID, _CTX_TAIL = _rest.split("{user_profile}")
+del _rest
+
+# soul.md / user.md 两路存储访问并发执行；云存储下每路都是一次网络往返
+_io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="user-ctx")
+
 
 def build_user_context(user_id: int) -> str:
     """
@@ -49,9 +62,28 @@ def build_user_context(user_id: int) -> str:
     Returns:
         str: 格式化的上下文字符串，可直接拼接到 System Prompt 前
     """
-    soul = read_soul(user_id)
+    # 两个文件很少变化：先取版本标记（本地 stat / 云端 HEAD），版本未变直接复用已拼好的字符串
+    storage = get_storage()
+    try:
+        f_soul = _io_pool.submit(storage.version, _key(user_id, "soul.md"))
+        user_ver = storage.version(_key(user_id, "user.md"))
+        soul_ver = f_soul.result()
+    except NotImplementedError:
+        return _build(user_id)
+    return _build_cached(user_id, soul_ver, user_ver)
+
+
+@lru_cache(maxsize=1024)
+def _build_cached(user_id: int, soul_ver: Optional[str], user_ver: Optional[str]) -> str:
+    # 版本号只参与缓存键；文件更新后版本变化，自然落到新的缓存项
+    return _build(user_id)
+
+
+def _build(user_id: int) -> str:
+    f_soul = _io_pool.submit(read_soul, user_id)
     user_profile = read_user_profile_md(user_id)
-    return _CONTEXT_TEMPLATE.format(soul=soul.strip(), user_profile=user_profile.strip())
+    soul = f_soul.result()
+    return "".join((_CTX_HEAD, soul.strip(), _CTX_MID, user_profile.strip(), _CTX_TAIL))
 
 
 def inject_user_context(
@@ -68,5 +100,11 @@ def inject_user_context(
     Returns:
         str: 合并后的 System Prompt（用户上下文 + Skill 系统提示）
     """
-    context = build_user_context(user_id)
+    return _combine(build_user_context(user_id), base_system_prompt)
+
+
+@lru_cache(maxsize=1024)
+def _combine(context: str, base_system_prompt: str) -> str:
+    # context 来自 _build_cached，版本不变时是同一个对象；skill 的系统提示词是模块常量。
+    # 两者的 hash 都缓存在 str 对象上，命中时只需一次字典查找，不再重复拼接长字符串
     return context + "\n\n" + base_system_prompt
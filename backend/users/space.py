@@ -12,6 +12,9 @@ users/space.py
 """
 from __future__ import annotations
 
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 from infra.storage import get_storage
 
 # ── 默认模版 ──────────────────────────────────────────────────
@@ -38,19 +41,32 @@ _DEFAULT_USER_MD = """\
 - **自我评价**：（未填写，例如：认真但容易紧张，需要多鼓励）
 """
 
+# 初始化用户空间时直接写入的字节内容，模块加载时编码一次
+_DEFAULT_FILES: tuple[tuple[str, bytes], ...] = (
+    ("soul.md", _DEFAULT_SOUL_MD.encode("utf-8")),
+    ("user.md", _DEFAULT_USER_MD.encode("utf-8")),
+)
+
+# 初始化时两个文件的 exists + put 并发执行；模块级复用，注册请求不再逐次创建/销毁线程池
+_io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="user-space")
+
 
 def _key(user_id: int, filename: str) -> str:
     """构建存储 key"""
     return f"user_spaces/{user_id}/{filename}"
 
 
+def _read(user_id: int, filename: str, default: str) -> str:
+    # 直接 GET，不存在时回退默认模版：常见情况（文件已存在）只需一次往返
+    try:
+        return get_storage().get(_key(user_id, filename)).decode("utf-8")
+    except FileNotFoundError:
+        return default
+
+
 def read_soul(user_id: int) -> str:
     """读取 soul.md，若不存在则返回默认模版"""
-    storage = get_storage()
-    key = _key(user_id, "soul.md")
-    if not storage.exists(key):
-        return _DEFAULT_SOUL_MD
-    return storage.get(key).decode("utf-8")
+    return _read(user_id, "soul.md", _DEFAULT_SOUL_MD)
 
 
 def write_soul(user_id: int, content: str) -> str:
@@ -61,11 +77,7 @@ def write_soul(user_id: int, content: str) -> str:
 
 def read_user_profile_md(user_id: int) -> str:
     """读取 user.md，若不存在则返回默认模版"""
-    storage = get_storage()
-    key = _key(user_id, "user.md")
-    if not storage.exists(key):
-        return _DEFAULT_USER_MD
-    return storage.get(key).decode("utf-8")
+    return _read(user_id, "user.md", _DEFAULT_USER_MD)
 
 
 def write_user_profile_md(user_id: int, content: str) -> str:
@@ -80,24 +92,28 @@ def init_user_space(user_id: int) -> None:
     若文件已存在则跳过（幂等）。
     """
     storage = get_storage()
-    for filename, default in [
-        ("soul.md", _DEFAULT_SOUL_MD),
-        ("user.md", _DEFAULT_USER_MD),
-    ]:
+
+    def _maybe_put(item: tuple[str, bytes]) -> None:
+        filename, default = item
         key = _key(user_id, filename)
         if not storage.exists(key):
-            storage.put(key, default.encode("utf-8"), content_type="text/markdown")
+            storage.put(key, default, content_type="text/markdown")
+
+    # 两个文件互不依赖，并发执行 exists + put；云存储下墙钟时间约减半
+    list(_io_pool.map(_maybe_put, _DEFAULT_FILES))
     print(f"[UserSpace] ✅ user_id={user_id} 空间初始化完成")
 
 
 def list_space_files(user_id: int) -> list[str]:
     """列出用户空间已有文件（本地模式）"""
-    # 本地模式：直接扫描目录
-    from pathlib import Path
+    # 本地模式：直接扫描目录；scandir 的 is_file() 用目录项自带的类型，无需逐个 stat
     from config.loader import app_settings
     st = app_settings.get_storage()
     if st.driver == "local":
-        root = Path(st.root_dir) / "user_spaces" / str(user_id)
-        if root.exists():
-            return [f.name for f in root.iterdir() if f.is_file()]
+        root = os.path.join(st.root_dir, "user_spaces", str(user_id))
+        try:
+            with os.scandir(root) as it:
+                return [e.name for e in it if e.is_file()]
+        except FileNotFoundError:
+            pass
     return []